@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+from bench.stubs import Faults, ReikiStub, RpcStub, serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# the run itself happens in a child process so every scale starts with clean singletons and its own peak RSS
+def configure(args, workdir: str, write_inputs: bool = True):
+    from inputs import config
+
+    keys_path = os.path.join(workdir, "keys.txt")
+    if write_inputs:
+        with open(keys_path, "w") as f:
+            for i in range(1, args.child + 1):
+                f.write(f"0x{i:064x}\n")
+        open(os.path.join(workdir, "proxies.txt"), "w").close()
+
+    config.API_URL = f"{args.api}/api"
+    config.OPBNB_RPC = args.rpc
+    config.KEYS_FILE_PATH = keys_path
+    config.MNEMONICS_FILE_PATH = os.path.join(workdir, "mnemonics.txt")
+    config.KEYSTORE_FILE_PATH = os.path.join(workdir, "logs", "keystore.bin")
+    config.PROXIES_FILE_PATH = os.path.join(workdir, "proxies.txt")
+    config.TOKENS_FILE_PATH = os.path.join(workdir, "logs", "tokens.jsonl")
+    config.JOURNAL_FILE_PATH = os.path.join(workdir, "logs", "journal.db")
+    config.RESULTS_FILE_PATH = os.path.join(workdir, "logs", "results.jsonl")
+    config.REPORT_FILE_PATH = os.path.join(workdir, "logs", "report.json")
+    config.TIMINGS_FILE_PATH = os.path.join(workdir, "logs", "timings.jsonl")
+    config.QUEUE_FILE_PATH = os.path.join(workdir, "logs", "queue.db")
+    config.THREADS = args.threads
+    config.MAX_THREADS = args.max_threads
+    config.CUSTOM_DELAY = (0, 0)
+    config.RECEIPT_POLL_INTERVAL = args.block_time / 2
+    config.RATE_LIMITS = {}
+    config.MOBILE_PROXY = ""
+    config.SPIN_LOTTERY_ONLY = False
+    config.MINT_EVERYTHING = True
+    config.SEND_CHIP_TO_HELL = True
+    config.SEND_TO_MASTER = False
+
+    # Web3Go and the worker write their logs and read the ABIs relative to the working directory
+    if write_inputs:
+        shutil.copytree(os.path.join(ROOT, "inputs"), os.path.join(workdir, "inputs"),
+                        ignore=shutil.ignore_patterns("*.py", "*.txt", "__pycache__"))
+        os.makedirs(os.path.join(workdir, "logs"), exist_ok=True)
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+
+
+def skip_sleeps():
+    import core.web3go
+
+    # the fixed settle sleeps after each transaction would otherwise dominate every measurement
+    fast_asyncio = types.SimpleNamespace(**{name: getattr(asyncio, name) for name in dir(asyncio) if not name.startswith("_")})
+    fast_asyncio.sleep = lambda delay, result=None: asyncio.sleep(0, result)
+    core.web3go.asyncio = fast_asyncio
+
+
+async def measure_lag(samples: list, interval: float = 0.05):
+    while True:
+        started_at = time.monotonic()
+        await asyncio.sleep(interval)
+        samples.append(time.monotonic() - started_at - interval)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+
+
+def child_command(args) -> list:
+    return [
+        sys.executable, "-m", "bench.run", "--child", str(args.child if args.child else 0), "--api", args.api,
+        "--rpc", args.rpc, "--threads", str(args.threads), "--max-threads", str(args.max_threads),
+        "--block-time", str(args.block_time), *(["--keep-sleeps"] if args.keep_sleeps else []),
+    ]
+
+
+# one scale split between `--shards` worker processes that share a work queue in the same workdir
+async def sharded(args):
+    workdir = tempfile.mkdtemp(prefix="web3go-bench-")
+    configure(args, workdir)
+
+    started_at = time.monotonic()
+    workers = [
+        await asyncio.create_subprocess_exec(*child_command(args), "--shard-worker", "--workdir", workdir, cwd=ROOT)
+        for _ in range(args.shards)
+    ]
+    await asyncio.gather(*(worker.wait() for worker in workers))
+    elapsed = time.monotonic() - started_at
+
+    from core.utils.work_queue import WorkQueue
+    queue = WorkQueue()
+    handled, succeeded = queue.summary()
+    queue.close()
+
+    print(json.dumps({
+        "accounts": args.child,
+        "shards": args.shards,
+        "handled": succeeded,
+        "seconds": round(elapsed, 3),
+        "accounts_per_second": round(args.child / elapsed, 2),
+    }))
+
+
+async def shard_worker(args):
+    configure(args, args.workdir, write_inputs=False)
+
+    from loguru import logger
+    from core.shard import ShardWorker
+    from core.utils.work_queue import WorkQueue
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    if not args.keep_sleeps:
+        skip_sleeps()
+
+    await ShardWorker(WorkQueue()).start()
+
+
+async def child(args):
+    if args.shard_worker:
+        return await shard_worker(args)
+    if args.shards:
+        return await sharded(args)
+
+    configure(args, tempfile.mkdtemp(prefix="web3go-bench-"))
+
+    from loguru import logger
+    from core.autoreger import AutoReger
+    from core.utils.metrics import metrics
+    from core.chain import fee_strategy
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    if not args.keep_sleeps:
+        skip_sleeps()
+
+    lag = []
+    lag_task = asyncio.create_task(measure_lag(lag))
+    reger = AutoReger()
+    started_at = time.monotonic()
+    await reger.start()
+    elapsed = time.monotonic() - started_at
+    lag_task.cancel()
+
+    with open(metrics.timings_path) as f:
+        totals = [row["seconds"] for row in map(json.loads, f) if row["step"] == "total"]
+    print(json.dumps({
+        "accounts": args.child,
+        "handled": reger.success,
+        "seconds": round(elapsed, 3),
+        "accounts_per_second": round(args.child / elapsed, 2),
+        "p50_account_seconds": percentile(totals, 0.5),
+        "p99_account_seconds": percentile(totals, 0.99),
+        "peak_rss_mb": peak_rss_mb(),
+        "loop_lag_p99_ms": round(percentile(lag, 0.99) * 1000, 1) if lag else None,
+        "loop_lag_max_ms": round(max(lag) * 1000, 1) if lag else None,
+        "retries": sum(metrics.retries.values()),
+        "fee_replacements": fee_strategy.replacements,
+    }))
+
+
+async def parent(args):
+    faults = Faults((args.latency_min, args.latency_max), args.error_rate, args.throttle_rate)
+    api_runner, api_url = await serve(ReikiStub(faults).app())
+    rpc_runner, rpc_url = await serve(RpcStub(block_time=args.block_time, stuck_rate=args.stuck_rate, faults=Faults(
+        (args.latency_min, args.latency_max)
+    )).app())
+    results = []
+
+    try:
+        for accounts in args.accounts:
+            args.child, args.api, args.rpc = accounts, api_url, rpc_url
+            process = await asyncio.create_subprocess_exec(
+                *child_command(args), *(["--shards", str(args.shards)] if args.shards else []),
+                cwd=ROOT, stdout=asyncio.subprocess.PIPE
+            )
+            stdout, _ = await process.communicate()
+            if process.returncode:
+                print(f"{accounts} accounts: benchmark run failed with exit code {process.returncode}")
+                continue
+
+            result = json.loads(stdout.decode().strip().splitlines()[-1])
+            results.append(result)
+            print(" | ".join(f"{key}: {value}" for key, value in result.items()), flush=True)
+    finally:
+        await api_runner.cleanup()
+        await rpc_runner.cleanup()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive AutoReger end to end against local reiki API and opBNB RPC stand-ins")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--threads", type=int, default=10)
+    parser.add_argument("--max-threads", type=int, default=200)
+    parser.add_argument("--latency-min", type=float, default=0.02)
+    parser.add_argument("--latency-max", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--throttle-rate", type=float, default=0.01)
+    parser.add_argument("--block-time", type=float, default=0.2)
+    parser.add_argument("--stuck-rate", type=float, default=0, help="share of transactions the node never mines")
+    parser.add_argument("--keep-sleeps", action="store_true", help="keep the fixed sleeps after each transaction")
+    parser.add_argument("--shards", type=int, default=0, help="split every scale between that many shard workers")
+    parser.add_argument("--out", help="write the results as JSON to this path")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--api", help=argparse.SUPPRESS)
+    parser.add_argument("--rpc", help=argparse.SUPPRESS)
+    parser.add_argument("--shard-worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    asyncio.run(child(arguments) if arguments.child else parent(arguments))
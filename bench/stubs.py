@@ -0,0 +1,235 @@
+import asyncio
+import base64
+import json
+import random
+import time
+import uuid
+
+from aiohttp import web
+from eth_utils import keccak
+
+
+class Faults:
+    def __init__(self, latency: tuple = (0, 0), error_rate: float = 0, throttle_rate: float = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        if self.latency[1] > 0:
+            await asyncio.sleep(random.uniform(*self.latency))
+
+        roll = random.random()
+        if roll < self.throttle_rate:
+            return web.json_response({"message": "Too Many Requests"}, status=429)
+        if roll < self.throttle_rate + self.error_rate:
+            return web.json_response({"message": "Internal Server Error"}, status=500)
+
+        return await handler(request)
+
+
+# stands in for the reiki.web3go.xyz endpoints Web3Go calls, every account starts with one chip and one piece
+class ReikiStub:
+    def __init__(self, faults: Faults = None):
+        self.faults = faults or Faults()
+        self.accounts = {}
+        self.events = {}
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults.middleware])
+        app.add_routes([
+            web.post("/api/account/web3/web3_nonce", self.web3_nonce),
+            web.post("/api/account/web3/web3_challenge", self.web3_challenge),
+            web.put("/api/checkin", self.checkin),
+            web.get("/api/lottery/offchain", self.offchain),
+            web.post("/api/lottery/try", self.lottery_try),
+            web.get("/api/lottery/mint/info", self.mint_info),
+            web.post("/api/lottery/claim", self.claim),
+            web.post("/api/lottery/claimSuccess", self.claim_success),
+            web.get("/api/lottery/mint/chip/any", self.chip_any),
+            web.post("/api/lottery/burn", self.burn),
+        ])
+        return app
+
+    def account(self, request) -> dict:
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        try:
+            payload = token.split(".")[1]
+            address = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["address"]
+        except (IndexError, ValueError, KeyError):
+            raise web.HTTPUnauthorized()
+
+        return self.accounts.setdefault(address, {"chip": 1, "piece": 1, "minted_chip": 0, "minted_piece": 0})
+
+    @staticmethod
+    def make_token(address: str, ttl: int = 3600) -> str:
+        payload = json.dumps({"address": address, "exp": int(time.time()) + ttl}).encode()
+        return "e30." + base64.urlsafe_b64encode(payload).decode().rstrip("=") + ".stub"
+
+    async def web3_nonce(self, request):
+        data = await request.json()
+        return web.json_response({"address": data["address"], "nonce": uuid.uuid4().hex, "challenge": "bench"})
+
+    async def web3_challenge(self, request):
+        data = await request.json()
+        return web.json_response({"extra": {"token": ReikiStub.make_token(data["address"])}})
+
+    async def checkin(self, request):
+        self.account(request)
+        return web.Response(text="true")
+
+    async def offchain(self, request):
+        account = self.account(request)
+        return web.json_response({"userGoldLeafCount": 0, "chipNum": account["chip"], "pieceNum": account["piece"]})
+
+    async def lottery_try(self, request):
+        self.account(request)
+        return web.json_response({"prize": "nothing"})
+
+    async def mint_info(self, request):
+        account = self.account(request)
+        return web.json_response({
+            "mintedChip": account["minted_chip"], "mintedPiece": account["minted_piece"], "wafer": 0
+        })
+
+    async def claim(self, request):
+        account = self.account(request)
+        data = await request.json()
+        event_id = uuid.uuid4().hex
+        self.events[event_id] = (account, data["type"], int(data.get("numPieces") or 1))
+        return web.json_response({"result": True, "nonce": "0x1", "signature": "0x" + "11" * 65, "eventId": event_id})
+
+    async def claim_success(self, request):
+        self.account(request)
+        data = await request.json()
+        event = self.events.pop(data["eventId"], None)
+        if event is None:
+            return web.json_response({"result": False})
+
+        account, kind, amount = event
+        if kind == "chip":
+            account["chip"], account["minted_chip"] = 0, account["minted_chip"] + 1
+        else:
+            account["piece"], account["minted_piece"] = 0, account["minted_piece"] + amount
+        return web.json_response({"result": True})
+
+    async def chip_any(self, request):
+        account = self.account(request)
+        return web.json_response({"tokenId": 1 if account["minted_chip"] else None})
+
+    async def burn(self, request):
+        account = self.account(request)
+        account["minted_chip"] = max(0, account["minted_chip"] - 1)
+        return web.json_response({}, status=201)
+
+
+# a JSON-RPC node that mines every accepted transaction into the next block, except a `stuck_rate` share of them
+# that never gets mined so only a replacement at the same nonce goes through
+class RpcStub:
+    def __init__(self, chain_id: int = 204, block_time: float = 0.2, faults: Faults = None, stuck_rate: float = 0):
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.faults = faults or Faults()
+        self.stuck_rate = stuck_rate
+        self.started_at = time.monotonic()
+        self.transactions = {}
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults.middleware])
+        app.add_routes([web.post("/", self.handle)])
+        return app
+
+    def block_number(self) -> int:
+        return int((time.monotonic() - self.started_at) / self.block_time) + 1
+
+    async def handle(self, request):
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response([self.call(item) for item in payload])
+        return web.json_response(self.call(payload))
+
+    def call(self, request: dict) -> dict:
+        handler = getattr(self, "rpc_" + request["method"], None)
+        if handler is None:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": "method not found"}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": handler(*request.get("params", []))}
+
+    def rpc_eth_chainId(self):
+        return hex(self.chain_id)
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.block_number())
+
+    def rpc_eth_getBlockByNumber(self, number, full=False):
+        block = self.block_number() if number in ("latest", "pending") else int(number, 16)
+        return {
+            "number": hex(block),
+            "hash": "0x" + keccak(block.to_bytes(32, "big")).hex(),
+            "parentHash": "0x" + keccak((block - 1).to_bytes(32, "big")).hex(),
+            "timestamp": hex(int(time.time())),
+            "baseFeePerGas": hex(8),
+            "gasLimit": hex(100_000_000),
+            "gasUsed": "0x0",
+            "transactions": [],
+        }
+
+    def rpc_eth_gasPrice(self):
+        return hex(10_009)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return hex(10_000)
+
+    def rpc_eth_feeHistory(self, block_count, newest_block, percentiles=None):
+        block_count = int(block_count, 16) if isinstance(block_count, str) else block_count
+        newest = self.block_number()
+        return {
+            "oldestBlock": hex(max(1, newest - block_count + 1)),
+            "baseFeePerGas": [hex(8)] * (block_count + 1),
+            "gasUsedRatio": [0.1] * block_count,
+            "reward": [[hex(10_000) for _ in percentiles or []] for _ in range(block_count)],
+        }
+
+    def rpc_eth_estimateGas(self, transaction, block=None):
+        return hex(150_000)
+
+    def rpc_eth_getTransactionCount(self, address, block=None):
+        return "0x0"
+
+    def rpc_eth_getBalance(self, address, block=None):
+        return hex(10 ** 18)
+
+    def rpc_eth_call(self, transaction, block=None):
+        return "0x" + "00" * 32
+
+    def rpc_eth_sendRawTransaction(self, raw: str):
+        tx_hash = "0x" + keccak(bytes.fromhex(raw[2:])).hex()
+        if tx_hash not in self.transactions:
+            self.transactions[tx_hash] = float("inf") if random.random() < self.stuck_rate else self.block_number() + 1
+        return tx_hash
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash: str):
+        block = self.transactions.get(tx_hash)
+        if block is None or block > self.block_number():
+            return None
+
+        return {
+            "transactionHash": tx_hash,
+            "transactionIndex": "0x0",
+            "blockNumber": hex(block),
+            "blockHash": "0x" + keccak(block.to_bytes(32, "big")).hex(),
+            "status": "0x1",
+            "gasUsed": hex(100_000),
+            "cumulativeGasUsed": hex(100_000),
+            "effectiveGasPrice": hex(10_009),
+            "logs": [],
+        }
+
+
+async def serve(app: web.Application, host: str = "127.0.0.1", port: int = 0) -> tuple:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
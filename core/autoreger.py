@@ -1,99 +1,251 @@
 import asyncio
+import os
 import random
 import time
-from asyncio import Semaphore, sleep, create_task, gather
+from asyncio import sleep, create_task, gather
 
+from core import chain
 from core.utils import logger
-from core.utils.file_to_list import file_to_list
-from core.web3go import Web3Go
+from core.utils.file_to_list import file_to_list, iter_lines
+from core.utils.hd_keys import HdKeySource, KeyStore
+from core.utils.journal import RunJournal
+from core.utils.metrics import metrics
+from core.utils.proxy_pool import proxy_pool
+from core.utils.result_sink import result_sink
+from core.utils.retry_policy import retry_budget
+from core.utils.scheduler import scheduler
+from core.utils.signer import LocalSigner, ProcessSigner
+from core.web3go import Web3Go, session_pool, ip_rotator
 
 from inputs.config import (
-    THREADS, CUSTOM_DELAY, KEYS_FILE_PATH, PROXIES_FILE_PATH, SPIN_LOTTERY_ONLY, MINT_EVERYTHING, SEND_TO_MASTER,
-    SEND_CHIP_TO_HELL
+    CUSTOM_DELAY, MAX_THREADS, KEYS_FILE_PATH, PROXIES_FILE_PATH, SPIN_LOTTERY_ONLY, MINT_EVERYTHING, SEND_TO_MASTER,
+    SEND_CHIP_TO_HELL, SIGNER_PROCESSES, STICKY_PROXIES, MNEMONICS_FILE_PATH, KEYSTORE_FILE_PATH, KEYSTORE_PASSWORD,
+    DERIVE_PROCESSES, REPORT_FILE_PATH, THREADS
 )
 
 
 class AutoReger:
+    report_path = REPORT_FILE_PATH
+
     def __init__(self):
         self.success = 0
         self.custom_user_delay = None
+        self.journal = RunJournal()
+        self.process_signer = None
 
-    @staticmethod
-    def get_accounts():
-        keys = file_to_list(KEYS_FILE_PATH)
-        proxies = file_to_list(PROXIES_FILE_PATH)
+    async def get_accounts(self):
+        proxies = iter_lines(PROXIES_FILE_PATH)
 
-        if not (min_accounts_len := len(keys)):
-            logger.info(f"keys.txt is empty!")
-            return
+        # with SIGNER_PROCESSES the keys are loaded and signed with only inside the worker processes
+        if AutoReger.uses_mnemonics():
+            signers = AutoReger.hd_key_source().stream()
+        elif SIGNER_PROCESSES > 0:
+            self.process_signer = ProcessSigner(KEYS_FILE_PATH, SIGNER_PROCESSES)
+            signers = self.process_signer.stream()
+        else:
+            signers = AutoReger.local_signers()
 
-        accounts = []
+        try:
+            async for signer in signers:
+                yield signer, next(proxies, None)
+        finally:
+            proxies.close()
 
-        for i in range(min_accounts_len):
-            accounts.append((
-                keys[i],
-                proxies[i] if len(proxies) > i else None
-             ))
+    @staticmethod
+    def hd_key_source() -> HdKeySource:
+        password = os.environ.get("WEB3GO_KEYSTORE_PASSWORD") or KEYSTORE_PASSWORD
+        if not password:
+            logger.warning("No keystore password is set, keys derived from mnemonics will not be cached")
+        return HdKeySource(MNEMONICS_FILE_PATH, KeyStore(KEYSTORE_FILE_PATH, password), DERIVE_PROCESSES)
+
+    @staticmethod
+    def uses_mnemonics() -> bool:
+        return os.path.exists(MNEMONICS_FILE_PATH) and next(iter_lines(MNEMONICS_FILE_PATH), None) is not None
 
-        return accounts
+    @staticmethod
+    async def local_signers():
+        for key in iter_lines(KEYS_FILE_PATH):
+            yield LocalSigner(key)
 
     async def start(self):
         self.custom_user_delay = CUSTOM_DELAY
 
-        accounts = AutoReger.get_accounts()
+        try:
+            await self.run()
+        finally:
+            await session_pool.close()
+            await ip_rotator.close()
+            if chain.is_loaded():
+                await chain.close_clients()
+            self.journal.close()
+            self.close_signer()
+            await result_sink.close()
+            metrics.write_report(self.report_path)
 
-        if accounts is None:
-            return
+    # as many consumers as the adaptive limiter may ever let run at once
+    async def run(self, workers: int = max(THREADS, MAX_THREADS)):
+        proxy_pool.load(file_to_list(PROXIES_FILE_PATH))
+
+        # a bounded queue between the key file and a fixed pool of consumers keeps memory flat
+        # however many keys there are, the scheduler still decides how many of them run at once
+        queue = asyncio.Queue(maxsize=workers * 2)
+        consumers = [create_task(self.consume(queue)) for _ in range(workers)]
+        total = left = 0
+
+        # with a pre-scan, accounts are queued in chunks whose balances are read in one go
+        batch_size = chain.balance_scanner.chunk_size if AutoReger.needs_balances() else 1
+        batch = []
+
+        try:
+            async for account in self.get_accounts():
+                # a source that is about to wait for more accounts yields None so the partial batch is not held back
+                if account is None:
+                    await self.enqueue(queue, batch)
+                    batch = []
+                    continue
+                total += 1
+                if self.is_account_done(account):
+                    await self.account_finished(account, True)
+                    continue
+                left += 1
+                batch.append(account)
+                if len(batch) >= batch_size:
+                    await self.enqueue(queue, batch)
+                    batch = []
 
-        logger.info(f"Successfully grab {len(accounts)} accounts")
+            await self.enqueue(queue, batch)
 
-        semaphore = Semaphore(THREADS)
+            for _ in consumers:
+                await queue.put(None)
 
-        tasks = []
-        for account in accounts:
-            task = create_task(self.worker(account, semaphore))
-            tasks.append(task)
+            await gather(*consumers)
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
 
-        await gather(* tasks)
+        if not total:
+            logger.info(f"keys.txt is empty!")
+            return
+
+        logger.info(f"Grabbed {total} accounts, {left} of them were left for today")
 
         if self.success:
             logger.success(f"Successfully handled {self.success} accounts :)")
         else:
             logger.warning(f"No accounts handled :(")
 
-    async def worker(self, account: tuple, semaphore: Semaphore):
-        key, proxy = account
-        logs = {"ok": False, "file": "fail.txt", "msg": ""}
+    async def enqueue(self, queue: asyncio.Queue, batch: list):
+        if batch and AutoReger.needs_balances():
+            await chain.balance_scanner.scan([signer.address for signer, _ in batch])
+
+        for account in batch:
+            await queue.put(account)
 
-        for _ in range(6):
+    async def consume(self, queue: asyncio.Queue):
+        while (account := await queue.get()) is not None:
+            if not await self.account_started(account):
+                if AutoReger.needs_balances():
+                    chain.balance_scanner.forget(account[0].address)
+                continue
+            ok = False
             try:
-                async with semaphore:
-                    await AutoReger.custom_delay()
+                with metrics.step(account[0].address, "total"):
+                    ok = await self.worker(account)
+            except Exception as e:
+                logger.error(f"Worker failed for {account[0].address}: {e}")
+            finally:
+                if AutoReger.needs_balances():
+                    chain.balance_scanner.forget(account[0].address)
+            await self.account_finished(account, ok)
+
+    # called right before a queued account is handled, returning False skips it; the sharded runner claims it here
+    async def account_started(self, account: tuple) -> bool:
+        return True
+
+    # called once per account, handled or skipped as already done today; the sharded runner reports it back
+    async def account_finished(self, account: tuple, ok: bool):
+        pass
+
+    async def worker(self, account: tuple):
+        signer, sticky_proxy = account
+        web3go = Web3Go(signer)
+        address = signer.address
+        logs = {"ok": False, "file": "fail", "msg": ""}
+        # the pre-scanned balances no longer hold once this run has minted
+        scanned = True
+
+        for attempt in range(6):
+            if attempt and not retry_budget.spend():
+                break
+
+            proxy = None
+            leased = False
+            try:
+                await AutoReger.custom_delay()
+
+                async with scheduler.limiter:
+                    leased = await ip_rotator.acquire()
+                    proxy = await proxy_pool.acquire(sticky_proxy if STICKY_PROXIES else None)
+                    done = self.journal.completed_steps(address)
+
+                    if "claim" in done:
+                        logs["ok"] = True
 
-                    web3go = Web3Go(key)
                     await web3go.define_proxy(proxy)
 
-                    if await web3go.login():
-                        if SPIN_LOTTERY_ONLY:
-                            await web3go.roll_up_lottery()
-                            logs["ok"] = True
-                        else:
-                            logs["ok"] = await web3go.claim()
-                        if MINT_EVERYTHING:
-                            await web3go.mint_chip_and_pieces()
-                        if SEND_TO_MASTER:
-                            await web3go.send_to_master()
+                    with metrics.step(address, "login"):
+                        logged_in = await web3go.login()
+
+                    if logged_in:
+                        if "claim" not in done:
+                            with metrics.step(address, "claim"):
+                                if SPIN_LOTTERY_ONLY:
+                                    await web3go.roll_up_lottery()
+                                    logs["ok"] = True
+                                else:
+                                    logs["ok"] = await web3go.claim()
+                            self.mark_done(address, proxy, "claim")
+                        if leased:
+                            # the on-chain steps below wait on blocks for minutes, the IP may rotate meanwhile
+                            leased = False
+                            await ip_rotator.release()
+                        if MINT_EVERYTHING and "mint" not in done:
+                            with metrics.step(address, "mint"):
+                                tx_hashes = await web3go.mint_chip_and_pieces()
+                            if tx_hashes:
+                                scanned = False
+                            if tx_hashes is not None:
+                                self.mark_done(address, proxy, "mint", ",".join(tx_hashes) or None)
+                        if SEND_TO_MASTER and "send_to_master" not in done:
+                            with metrics.step(address, "send_to_master"):
+                                pieces = chain.balance_scanner.pieces.get(address) if scanned else None
+                                sent = await web3go.send_to_master(pieces)
+                            if sent is None or sent[0]:
+                                self.mark_done(address, proxy, "send_to_master", sent and sent[1])
                         minted_chip, minted_piece = await web3go.get_minted_balance()
-                        if SEND_CHIP_TO_HELL:
-                            if minted_chip > 0:
-                                await web3go.burn_chip()
+                        if SEND_CHIP_TO_HELL and "burn" not in done:
+                            chips = chain.balance_scanner.chips.get(address) if scanned else None
+                            if minted_chip > 0 and chips != 0:
+                                with metrics.step(address, "burn"):
+                                    tx_hash = await web3go.burn_chip()
                                 await web3go.get_minted_balance()
+                                if tx_hash:
+                                    self.mark_done(address, proxy, "burn", tx_hash)
+                            else:
+                                self.mark_done(address, proxy, "burn")
 
+                        if AutoReger.required_steps() <= set(self.journal.completed_steps(address)):
+                            self.mark_done(address, proxy, "done")
                         await web3go.logout()
                         break
             except Exception as e:
                 logs["msg"] = str(e)
                 logger.error(f"Error {e}")
+                metrics.record_retry("AutoReger.worker")
+            finally:
+                proxy_pool.release(proxy)
+                if leased:
+                    await ip_rotator.release()
 
         if logs["ok"]:
             logs["file"] = "success"
@@ -103,6 +255,35 @@ class AutoReger:
             logs["msg"] = "Check logs/out.log for more info"
 
         web3go.logs(logs["file"], logs["msg"])
+        return logs["ok"]
+
+    @staticmethod
+    def required_steps():
+        steps = {"claim"}
+        if MINT_EVERYTHING:
+            steps.add("mint")
+        if SEND_TO_MASTER:
+            steps.add("send_to_master")
+        if SEND_CHIP_TO_HELL:
+            steps.add("burn")
+        return steps
+
+    @staticmethod
+    def needs_balances():
+        return SEND_TO_MASTER or SEND_CHIP_TO_HELL
+
+    def mark_done(self, address: str, proxy: str, step: str, tx_hash: str = None):
+        self.journal.mark_done(address, step, tx_hash)
+        result_sink.record(address, "done", step=step, proxy=proxy, tx_hash=tx_hash)
+
+    def is_account_done(self, account: tuple):
+        signer, _ = account
+        return self.journal.is_done(signer.address)
+
+    def close_signer(self):
+        if self.process_signer is not None:
+            self.process_signer.close()
+            self.process_signer = None
 
     @staticmethod
     async def custom_delay():
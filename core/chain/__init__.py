@@ -0,0 +1,41 @@
+import importlib
+import sys
+
+# web3 and eth_abi take most of the start-up time, so the chain stack is only imported when something first
+# reaches for one of these names; HTTP-only runs (check-in, lottery) never load it
+_EXPORTS = {
+    "OpBNBClient": ".client", "opbnb_client": ".client", "get_client": ".client", "close_clients": ".client",
+    "CHAIN_ID": ".contracts", "CHIP_ADDRESS": ".contracts", "PIECE_ADDRESS": ".contracts",
+    "COMMODITY_TOKEN_ADDRESS": ".contracts", "MULTICALL3_ADDRESS": ".contracts",
+    "get_contract": ".contracts", "load_abi": ".contracts",
+    "NonceManager": ".nonce_manager", "nonce_manager": ".nonce_manager",
+    "ReceiptTracker": ".receipts", "receipt_tracker": ".receipts",
+    "BalanceScanner": ".balances", "balance_scanner": ".balances",
+    "GasTable": ".gas", "gas_table": ".gas",
+    "FeeStrategy": ".fees", "fee_strategy": ".fees",
+    "tx_builder": ".tx_builder",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    importlib.import_module(_EXPORTS[name], __name__)
+    _bind()
+    return globals()[name]
+
+
+# importing a submodule sets it as an attribute of the package, which would hide `nonce_manager` the singleton
+# behind `nonce_manager` the module, so every export of a loaded submodule is (re)bound after each import
+def _bind():
+    for name, relative in _EXPORTS.items():
+        module = sys.modules.get(__name__ + relative)
+        if module is not None:
+            globals()[name] = getattr(module, name, module)
+
+
+def is_loaded() -> bool:
+    return f"{__name__}.client" in sys.modules
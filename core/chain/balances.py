@@ -0,0 +1,58 @@
+import asyncio
+
+from .client import opbnb_client
+from .contracts import COMMODITY_TOKEN_ADDRESS, get_contract
+from ..utils import logger
+
+# ERC-721 balanceOf(address), the chip contract ABI does not ship it
+BALANCE_OF_SELECTOR = bytes.fromhex("70a08231")
+
+
+# reads piece balances through balanceOfBatch and chip balances through one Multicall3 aggregate per chunk,
+# workers consult the table instead of asking the chain per account, a missing entry means "not known"
+class BalanceScanner:
+    def __init__(self, client=opbnb_client, chunk_size: int = 500):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.pieces = {}
+        self.chips = {}
+
+    async def scan(self, addresses: list):
+        await self.client.connect()
+
+        for i in range(0, len(addresses), self.chunk_size):
+            chunk = addresses[i:i + self.chunk_size]
+            pieces, chips = await asyncio.gather(self._pieces(chunk), self._chips(chunk), return_exceptions=True)
+
+            if isinstance(pieces, Exception):
+                logger.debug(f"Piece balance pre-scan failed: {pieces}")
+            else:
+                self.pieces.update(zip(chunk, pieces))
+
+            if isinstance(chips, Exception):
+                logger.debug(f"Chip balance pre-scan failed: {chips}")
+            else:
+                self.chips.update((address, chip) for address, chip in zip(chunk, chips) if chip is not None)
+
+    async def _pieces(self, addresses: list) -> list:
+        piece_contract = get_contract("piece")
+        return await piece_contract.functions.balanceOfBatch(addresses, [0] * len(addresses)).call()
+
+    async def _chips(self, addresses: list) -> list:
+        multicall = get_contract("multicall3")
+        calls = [
+            (COMMODITY_TOKEN_ADDRESS, True, BALANCE_OF_SELECTOR + bytes.fromhex(address[2:].lower().zfill(64)))
+            for address in addresses
+        ]
+        results = await multicall.functions.aggregate3(calls).call()
+        return [
+            int.from_bytes(data, "big") if success and len(data) == 32 else None
+            for success, data in results
+        ]
+
+    def forget(self, address: str):
+        self.pieces.pop(address, None)
+        self.chips.pop(address, None)
+
+
+balance_scanner = BalanceScanner()
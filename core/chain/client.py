@@ -0,0 +1,64 @@
+from urllib.parse import urlparse
+
+import aiohttp
+from web3 import AsyncWeb3, AsyncHTTPProvider
+
+from inputs.config import OPBNB_RPC
+from ..utils.metrics import metrics
+from ..utils.scheduler import scheduler
+
+
+# waits for the RPC host's rate limit before each request, outside the request and its timeout
+class ThrottledHTTPProvider(AsyncHTTPProvider):
+    async def make_request(self, method, params):
+        await scheduler.before_request(urlparse(self.endpoint_uri).hostname)
+        return await super().make_request(method, params)
+
+
+class OpBNBClient:
+    def __init__(self, rpc_url: str = OPBNB_RPC, pool_size: int = 100):
+        self.rpc_url = rpc_url
+        self.pool_size = pool_size
+
+        self.provider = ThrottledHTTPProvider(rpc_url)
+        self.w3 = AsyncWeb3(self.provider)
+        self.session = None
+
+    async def connect(self) -> AsyncWeb3:
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300, keepalive_timeout=60)
+            session = aiohttp.ClientSession(
+                connector=connector,
+                raise_for_status=True,
+                trace_configs=[scheduler.trace_config(), metrics.trace_config()]
+            )
+            self.session = await self.provider.cache_async_session(session)
+
+            if self.session is not session:
+                await session.close()
+
+        return self.w3
+
+    async def throttle(self):
+        await scheduler.before_request(urlparse(self.rpc_url).hostname)
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+
+_clients = {}
+
+
+def get_client(rpc_url: str = OPBNB_RPC) -> OpBNBClient:
+    if rpc_url not in _clients:
+        _clients[rpc_url] = OpBNBClient(rpc_url)
+    return _clients[rpc_url]
+
+
+async def close_clients():
+    for client in _clients.values():
+        await client.close()
+
+
+opbnb_client = get_client()
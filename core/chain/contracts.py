@@ -0,0 +1,36 @@
+import json
+from functools import lru_cache
+
+from eth_utils import to_checksum_address
+
+from inputs.config import OPBNB_RPC
+from .client import get_client
+
+CHAIN_ID = 204
+
+CHIP_ADDRESS = to_checksum_address("0x00a9De8Af37a3179d7213426E78Be7DFb89F2b19")
+PIECE_ADDRESS = to_checksum_address("0x2c085411ca401a84a9D98DEc415282FA239D53bB")
+COMMODITY_TOKEN_ADDRESS = to_checksum_address("0xe5116e725a8c1bf322df6f5842b73102f3ef0cee")
+MULTICALL3_ADDRESS = to_checksum_address("0xcA11bde05977b3631167028862bE2a173976CA11")
+
+CONTRACTS = {
+    "chip": (CHIP_ADDRESS, "inputs/chip_abi.json"),
+    "piece": (PIECE_ADDRESS, "inputs/piece_abi.json"),
+    "multicall3": (MULTICALL3_ADDRESS, "inputs/multicall3_abi.json"),
+}
+
+_contracts = {}
+
+
+@lru_cache(maxsize=None)
+def load_abi(path: str) -> tuple:
+    with open(path, 'r') as f:
+        return tuple(json.load(f))
+
+
+def get_contract(name: str, rpc_url: str = OPBNB_RPC):
+    if (name, rpc_url) not in _contracts:
+        address, abi_path = CONTRACTS[name]
+        w3 = get_client(rpc_url).w3
+        _contracts[(name, rpc_url)] = w3.eth.contract(address=address, abi=load_abi(abi_path))
+    return _contracts[(name, rpc_url)]
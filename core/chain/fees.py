@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from web3 import Web3
+
+from inputs.config import FEE_CAP_GWEI, FEE_BUMP_PERCENT, FEE_HISTORY_BLOCKS
+from .client import OpBNBClient, opbnb_client
+from .tx_builder import MAX_FEE_PER_GAS, MAX_PRIORITY_FEE_PER_GAS
+from ..utils import logger
+
+# nodes reject a replacement at the same nonce unless both fee fields go up by at least this much
+MIN_REPLACEMENT_BUMP_PERCENT = 10
+
+
+# prices transactions from eth_feeHistory: the next block's base fee with room for it to double, plus the median tip
+# of the last blocks, never below the old fixed fees and never above the run's fee cap; one history read is shared
+# by every account for `refresh_interval` seconds
+class FeeStrategy:
+    def __init__(self, client: OpBNBClient, fee_cap: int, bump_percent: float = FEE_BUMP_PERCENT,
+                 history_blocks: int = FEE_HISTORY_BLOCKS, percentile: int = 50, refresh_interval: float = 5):
+        self.client = client
+        self.fee_cap = fee_cap
+        self.bump_percent = max(bump_percent, MIN_REPLACEMENT_BUMP_PERCENT)
+        self.history_blocks = history_blocks
+        self.percentile = percentile
+        self.refresh_interval = refresh_interval
+
+        self.replacements = 0
+        self._fees = None
+        self._updated_at = 0
+        self._lock = asyncio.Lock()
+
+    async def fees(self) -> tuple:
+        if self._fees is None or time.monotonic() - self._updated_at > self.refresh_interval:
+            async with self._lock:
+                if self._fees is None or time.monotonic() - self._updated_at > self.refresh_interval:
+                    self._fees = await self._read_history()
+                    self._updated_at = time.monotonic()
+        return self._fees
+
+    async def apply(self, transaction: dict):
+        transaction['maxFeePerGas'], transaction['maxPriorityFeePerGas'] = await self.fees()
+
+    # raises both fees for a replacement at the same nonce, False once the cap leaves no room for a valid bump
+    def bump(self, transaction: dict) -> bool:
+        max_fee = int(transaction['maxFeePerGas'] * (100 + self.bump_percent) / 100) + 1
+        priority_fee = int(transaction['maxPriorityFeePerGas'] * (100 + self.bump_percent) / 100) + 1
+        if max_fee > self.fee_cap:
+            return False
+
+        transaction['maxFeePerGas'], transaction['maxPriorityFeePerGas'] = max_fee, min(priority_fee, max_fee)
+        self.replacements += 1
+        return True
+
+    async def _read_history(self) -> tuple:
+        try:
+            w3 = await self.client.connect()
+            history = await w3.eth.fee_history(self.history_blocks, "latest", [self.percentile])
+        except Exception as e:
+            logger.debug(f"Failed to read fee history, using the default fees: {e}")
+            return self._bounded(MAX_FEE_PER_GAS, MAX_PRIORITY_FEE_PER_GAS)
+
+        base_fee = history["baseFeePerGas"][-1]
+        tips = sorted(reward[0] for reward in history.get("reward") or [] if reward)
+        priority_fee = max(MAX_PRIORITY_FEE_PER_GAS, tips[len(tips) // 2] if tips else 0)
+        max_fee = max(MAX_FEE_PER_GAS, 2 * base_fee + priority_fee)
+        return self._bounded(max_fee, priority_fee)
+
+    def _bounded(self, max_fee: int, priority_fee: int) -> tuple:
+        max_fee = min(max_fee, self.fee_cap)
+        return max_fee, min(priority_fee, max_fee)
+
+
+fee_strategy = FeeStrategy(opbnb_client, Web3.to_wei(FEE_CAP_GWEI, "gwei"))
@@ -0,0 +1,44 @@
+import time
+
+from inputs.config import GAS_CACHE_TTL
+
+
+# gas used by the fixed contract calls barely moves between accounts, so an estimate (or a receipt's gasUsed)
+# for one (contract, selector, shape) is reused with a margin until it expires or a transaction runs out of gas
+class GasTable:
+    def __init__(self, margin: float = 1.2, ttl: float = GAS_CACHE_TTL):
+        self.margin = margin
+        self.ttl = ttl
+        self._entries = {}
+
+    @staticmethod
+    def key(transaction: dict, shape=None) -> tuple:
+        return transaction['to'].lower(), transaction['data'][:10], shape
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        gas, updated_at = entry
+        if time.monotonic() - updated_at > self.ttl:
+            del self._entries[key]
+            return None
+
+        return int(gas * self.margin)
+
+    def update(self, key: tuple, gas: int):
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] <= self.ttl:
+            gas = max(gas, entry[0])
+        self._entries[key] = (gas, time.monotonic())
+
+    def invalidate(self, key: tuple):
+        self._entries.pop(key, None)
+
+    @staticmethod
+    def ran_out_of_gas(transaction: dict, receipt) -> bool:
+        return receipt.status == 0 and receipt.gasUsed >= transaction['gas'] * 0.98
+
+
+gas_table = GasTable()
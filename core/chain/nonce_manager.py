@@ -0,0 +1,38 @@
+import asyncio
+from collections import defaultdict
+
+from .client import opbnb_client
+
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "replacement transaction underpriced",
+)
+
+
+class NonceManager:
+    def __init__(self, client=opbnb_client):
+        self.client = client
+        self._nonces = {}
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def next_nonce(self, address: str) -> int:
+        async with self._locks[address]:
+            if address not in self._nonces:
+                w3 = await self.client.connect()
+                self._nonces[address] = await w3.eth.get_transaction_count(address, "pending")
+
+            nonce = self._nonces[address]
+            self._nonces[address] += 1
+            return nonce
+
+    def resync(self, address: str):
+        self._nonces.pop(address, None)
+
+    @staticmethod
+    def is_nonce_error(error: Exception) -> bool:
+        msg = str(error).lower()
+        return any(pattern in msg for pattern in NONCE_ERRORS)
+
+
+nonce_manager = NonceManager()
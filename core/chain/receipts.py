@@ -0,0 +1,145 @@
+import asyncio
+
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted
+
+from inputs.config import RECEIPT_POLL_INTERVAL
+from .client import opbnb_client
+from ..utils import logger
+
+INT_FIELDS = ("status", "gasUsed", "cumulativeGasUsed", "effectiveGasPrice", "blockNumber", "transactionIndex")
+
+
+# one background poller for every in-flight transaction: a single eth_blockNumber per tick,
+# then eth_getTransactionReceipt for all pending hashes in JSON-RPC batches only when a new block arrives
+class ReceiptTracker:
+    def __init__(self, client=opbnb_client, poll_interval: float = RECEIPT_POLL_INTERVAL, batch_size: int = 100):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+
+        self._waiters = {}
+        self._block_waiters = []
+        self._task = None
+        self._last_block = None
+        self._request_id = 0
+
+    async def wait(self, tx_hash, timeout: float = 240):
+        return await self.wait_any([tx_hash], timeout)
+
+    # resolves with the first receipt among hashes that share a nonce (a transaction and its replacements),
+    # or with None once `blocks` new blocks have passed without any of them being mined
+    async def wait_any(self, tx_hashes: list, timeout: float = 240, blocks: int = None):
+        loop = asyncio.get_running_loop()
+        tx_hashes = [ReceiptTracker.to_hex(tx_hash) for tx_hash in tx_hashes]
+        futures = {}
+
+        for tx_hash in tx_hashes:
+            futures[tx_hash] = loop.create_future()
+            self._waiters.setdefault(tx_hash, []).append(futures[tx_hash])
+
+        block_waiter = None
+        if blocks is not None:
+            block_waiter = (None if self._last_block is None else self._last_block + blocks, blocks, loop.create_future())
+            self._block_waiters.append(block_waiter)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+
+        waiting = list(futures.values()) + ([block_waiter[2]] if block_waiter else [])
+        try:
+            done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise TimeExhausted(f"Transaction {tx_hashes[-1]} is not in the chain after {timeout} seconds")
+            for future in futures.values():
+                if future in done:
+                    return future.result()
+            return None
+        finally:
+            if block_waiter in self._block_waiters:
+                self._block_waiters.remove(block_waiter)
+            for tx_hash, future in futures.items():
+                waiters = self._waiters.get(tx_hash, [])
+                if future in waiters:
+                    waiters.remove(future)
+                if not waiters:
+                    self._waiters.pop(tx_hash, None)
+
+    # the receipt of whichever of the hashes is already mined, right away rather than on the next block
+    async def lookup(self, tx_hashes: list):
+        await self.client.connect()
+        receipts = await self._batch_call(
+            [("eth_getTransactionReceipt", [ReceiptTracker.to_hex(tx_hash)]) for tx_hash in tx_hashes]
+        )
+        for receipt in receipts:
+            if receipt is not None:
+                return ReceiptTracker.format_receipt(receipt)
+
+    async def _poll(self):
+        await self.client.connect()
+
+        while self._waiters or self._block_waiters:
+            await asyncio.sleep(self.poll_interval)
+
+            try:
+                if not await self._new_block():
+                    continue
+
+                hashes = list(self._waiters)
+                for i in range(0, len(hashes), self.batch_size):
+                    await self._poll_batch(hashes[i:i + self.batch_size])
+            except Exception as e:
+                logger.debug(f"Receipt polling failed: {e}")
+
+    async def _new_block(self) -> bool:
+        block, = await self._batch_call([("eth_blockNumber", [])])
+        if block is None or int(block, 16) == self._last_block:
+            return False
+        self._last_block = int(block, 16)
+        self._wake_block_waiters()
+        return True
+
+    def _wake_block_waiters(self):
+        for i, (target, blocks, future) in enumerate(self._block_waiters):
+            if target is None:
+                self._block_waiters[i] = (self._last_block + blocks, blocks, future)
+            elif self._last_block >= target and not future.done():
+                future.set_result(None)
+
+    async def _poll_batch(self, hashes: list):
+        receipts = await self._batch_call([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes])
+
+        for tx_hash, receipt in zip(hashes, receipts):
+            if receipt is None:
+                continue
+            receipt = ReceiptTracker.format_receipt(receipt)
+            for future in self._waiters.pop(tx_hash, []):
+                if not future.done():
+                    future.set_result(receipt)
+
+    async def _batch_call(self, calls: list) -> list:
+        payload = []
+        for method, params in calls:
+            self._request_id += 1
+            payload.append({"jsonrpc": "2.0", "id": self._request_id, "method": method, "params": params})
+
+        await self.client.throttle()
+        async with self.client.session.post(self.client.rpc_url, json=payload) as response:
+            results = {item.get("id"): item.get("result") for item in await response.json()}
+
+        return [results.get(call["id"]) for call in payload]
+
+    @staticmethod
+    def to_hex(tx_hash) -> str:
+        return tx_hash if isinstance(tx_hash, str) else "0x" + bytes(tx_hash).hex()
+
+    @staticmethod
+    def format_receipt(receipt: dict) -> AttributeDict:
+        receipt = dict(receipt)
+        for field in INT_FIELDS:
+            if isinstance(receipt.get(field), str):
+                receipt[field] = int(receipt[field], 16)
+        return AttributeDict(receipt)
+
+
+receipt_tracker = ReceiptTracker()
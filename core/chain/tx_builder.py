@@ -0,0 +1,65 @@
+from eth_abi import encode
+from eth_utils import function_signature_to_4byte_selector, to_bytes, to_checksum_address
+
+from .contracts import CHAIN_ID, CHIP_ADDRESS, PIECE_ADDRESS, COMMODITY_TOKEN_ADDRESS
+
+MAX_FEE_PER_GAS = 10_009  # wei, 0.000010009 gwei
+MAX_PRIORITY_FEE_PER_GAS = 10_000  # wei, 0.00001 gwei
+
+
+class Method:
+    def __init__(self, signature: str):
+        self.signature = signature
+        self.types = tuple(signature[signature.index("(") + 1:-1].split(","))
+        self.selector = function_signature_to_4byte_selector(signature)
+
+    def encode(self, *args) -> str:
+        return "0x" + (self.selector + encode(self.types, args)).hex()
+
+
+SAFE_BUY_TOKEN = Method("safeBuyToken(address,address,address,uint256,uint256,bytes)")
+CLAIM = Method("claim(address,address,uint256,uint256,uint256,uint256,bytes)")
+SAFE_TRANSFER_FROM = Method("safeTransferFrom(address,address,uint256,uint256,bytes)")
+BURN = Method("burn(uint256)")
+
+
+# builds complete EIP-1559 transactions without touching the node, gas is left out when unknown
+# so the sender can still estimate it
+def build_transaction(sender: str, to: str, data: str, nonce: int, gas: int = None,
+                      max_fee: int = MAX_FEE_PER_GAS, priority_fee: int = MAX_PRIORITY_FEE_PER_GAS) -> dict:
+    transaction = {
+        'type': 2,
+        'chainId': CHAIN_ID,
+        'from': sender,
+        'to': to,
+        'value': 0,
+        'data': data,
+        'nonce': nonce,
+        'maxFeePerGas': max_fee,
+        'maxPriorityFeePerGas': priority_fee,
+    }
+    if gas is not None:
+        transaction['gas'] = gas
+    return transaction
+
+
+def chip_mint(sender: str, nonce: int, mint_nonce: int, signature: str, **fees) -> dict:
+    data = SAFE_BUY_TOKEN.encode(
+        CHIP_ADDRESS, COMMODITY_TOKEN_ADDRESS, sender, CHAIN_ID, mint_nonce, to_bytes(hexstr=signature)
+    )
+    return build_transaction(sender, CHIP_ADDRESS, data, nonce, **fees)
+
+
+def piece_claim(sender: str, nonce: int, amount: int, mint_nonce: int, signature: str, **fees) -> dict:
+    data = CLAIM.encode(PIECE_ADDRESS, sender, 0, amount, CHAIN_ID, mint_nonce, to_bytes(hexstr=signature))
+    return build_transaction(sender, PIECE_ADDRESS, data, nonce, **fees)
+
+
+def piece_transfer(sender: str, nonce: int, to: str, amount: int, **fees) -> dict:
+    data = SAFE_TRANSFER_FROM.encode(sender, to_checksum_address(to), 0, amount, b'')
+    return build_transaction(sender, PIECE_ADDRESS, data, nonce, **fees)
+
+
+def chip_burn(sender: str, nonce: int, token_id: int, **fees) -> dict:
+    data = BURN.encode(int(token_id))
+    return build_transaction(sender, COMMODITY_TOKEN_ADDRESS, data, nonce, **fees)
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import socket
+import sys
+
+from eth_utils import to_checksum_address
+
+from core.autoreger import AutoReger
+from core.utils import logger
+from core.utils.file_to_list import file_to_list
+from core.utils.result_sink import result_sink, with_suffix
+from core.utils.signer import LocalSigner, ProcessSigner
+from core.utils.token_store import token_store
+from core.utils.work_queue import WorkQueue
+
+from inputs.config import (
+    KEYS_FILE_PATH, PROXIES_FILE_PATH, REPORT_FILE_PATH, SIGNER_PROCESSES, SHARD_BATCH_SIZE,
+    SHARD_POLL_INTERVAL
+)
+
+
+# a worker of a sharded run: instead of walking the key file it leases account positions from the shared work queue,
+# so any number of these, on this host or on others that mount the queue file, split one day's accounts between them
+class ShardWorker(AutoReger):
+    def __init__(self, queue: WorkQueue):
+        super().__init__()
+        self.queue = queue
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.positions = {}
+        self.keys = None
+        self.hd_source = None
+        self.proxies = []
+
+        # results, success/fail lists, cached tokens and reports are per worker, appends from several processes
+        # would interleave; tokens of every worker are still read back and merged by the next run
+        result_sink.suffix = self.worker_id
+        token_store.compacts = False
+        self.report_path = with_suffix(REPORT_FILE_PATH, self.worker_id)
+
+    async def start(self):
+        heartbeat = asyncio.create_task(self.heartbeat())
+        try:
+            await super().start()
+        finally:
+            heartbeat.cancel()
+            await asyncio.to_thread(self.queue.release, self.worker_id)
+            self.queue.close()
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(self.queue.lease_timeout / 3)
+            await asyncio.to_thread(self.queue.heartbeat, self.worker_id)
+
+    async def get_accounts(self):
+        total = await self.load_accounts()
+        await asyncio.to_thread(self.queue.seed, total, SHARD_BATCH_SIZE)
+
+        while True:
+            positions = await asyncio.to_thread(self.queue.lease, self.worker_id)
+            if not positions:
+                # others still hold accounts, keep polling in case one of them dies and its lease expires
+                if not await asyncio.to_thread(self.queue.remaining):
+                    return
+                yield None
+                await asyncio.sleep(SHARD_POLL_INTERVAL)
+                continue
+
+            signers = await self.signers(positions)
+            for position in positions:
+                self.positions[signers[position]] = position
+                yield signers[position], self.proxies[position] if position < len(self.proxies) else None
+            yield None
+
+    async def account_started(self, account: tuple) -> bool:
+        # positions stay pending, and so can be stolen, until a consumer actually picks them up
+        position = self.positions.get(account[0])
+        if position is None or await asyncio.to_thread(self.queue.claim, position, self.worker_id):
+            return True
+
+        # a worker that ran dry stole it in the meantime
+        self.positions.pop(account[0], None)
+        return False
+
+    async def account_finished(self, account: tuple, ok: bool):
+        position = self.positions.pop(account[0], None)
+        if position is not None:
+            await asyncio.to_thread(self.queue.finish, position, ok)
+
+    async def load_accounts(self) -> int:
+        self.proxies = file_to_list(PROXIES_FILE_PATH)
+
+        if AutoReger.uses_mnemonics():
+            self.hd_source = AutoReger.hd_key_source()
+            return len(await self.hd_source.load())
+        if SIGNER_PROCESSES > 0:
+            self.process_signer = ProcessSigner(KEYS_FILE_PATH, SIGNER_PROCESSES)
+            return await self.process_signer.count()
+
+        self.keys = file_to_list(KEYS_FILE_PATH)
+        return len(self.keys)
+
+    async def signers(self, positions: list) -> dict:
+        if self.hd_source is not None:
+            return {
+                position: LocalSigner(self.hd_source.records[position][0],
+                                      to_checksum_address(self.hd_source.records[position][1]))
+                for position in positions
+            }
+        if self.process_signer is not None:
+            signers = await self.process_signer.signers(positions[0], positions[-1] + 1)
+            return {signer.index: signer for signer in signers}
+
+        return {position: LocalSigner(self.keys[position]) for position in positions}
+
+
+# runs `processes` shard workers on this host and waits for the day's queue to drain, more workers can join
+# from other hosts with `main.py --shard-worker` as long as they see the same QUEUE_FILE_PATH
+async def run_shards(processes: int, command: list):
+    if AutoReger.uses_mnemonics():
+        # derive (and cache) once here rather than in every worker at the same time
+        await AutoReger.hd_key_source().load()
+    token_store.merge()
+
+    workers = [
+        await asyncio.create_subprocess_exec(sys.executable, *command, "--shard-worker")
+        for _ in range(processes)
+    ]
+    codes = await asyncio.gather(*(worker.wait() for worker in workers))
+
+    queue = WorkQueue()
+    handled, succeeded = queue.summary()
+    remaining = queue.remaining()
+    queue.close()
+
+    failed = sum(1 for code in codes if code)
+    if failed:
+        logger.warning(f"{failed} of {processes} shard workers exited with an error")
+    logger.info(f"Sharded run: {handled} accounts handled, {succeeded} successfully, {remaining} left")
@@ -3,3 +3,13 @@ def file_to_list(
 ):
     with open(filename, 'r+') as f:
         return list(filter(bool, f.read().splitlines()))
+
+
+
+def iter_lines(
+        filename: str
+):
+    with open(filename, 'r') as f:
+        for line in f:
+            if line := line.rstrip('\r\n'):
+                yield line
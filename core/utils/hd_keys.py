@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import struct
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from Crypto.Cipher import AES
+from Crypto.Protocol.KDF import scrypt
+from eth_account import Account
+from eth_keys import keys
+from eth_utils import to_checksum_address
+
+from .file_to_list import iter_lines
+from .logger import logger
+from .signer import LocalSigner
+
+# every account of a mnemonic is a child of this node, only the last index differs
+PARENT_PATH = "m/44'/60'/0'/0"
+
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+HARDENED = 0x80000000
+
+MAGIC = b"W3GK"
+RECORD = struct.Struct(">I32s20s")  # index, private key, address
+
+
+def parse_line(line: str) -> tuple:
+    # "mnemonic | count" or "mnemonic | start-stop", a bare mnemonic is account 0 only
+    mnemonic, _, indices = (part.strip() for part in line.partition("|"))
+    if "-" in indices:
+        start, stop = (int(value) for value in indices.split("-"))
+        return mnemonic, start, stop + 1
+    return mnemonic, 0, int(indices or 1)
+
+
+def hmac_sha512(key: bytes, data: bytes) -> bytes:
+    return hmac.new(key, data, hashlib.sha512).digest()
+
+
+def path_indices(path: str) -> list:
+    return [int(node[:-1]) + HARDENED if node.endswith("'") else int(node) for node in path.split("/")[1:]]
+
+
+def child_key(key: int, chain_code: bytes, index: int, point: bytes = None) -> tuple:
+    # BIP32 private child derivation, `point` is the parent's compressed public key when the caller already has it
+    if index >= HARDENED:
+        data = b"\x00" + key.to_bytes(32, "big")
+    else:
+        data = point or keys.PrivateKey(key.to_bytes(32, "big")).public_key.to_compressed_bytes()
+    child = hmac_sha512(chain_code, data + index.to_bytes(4, "big"))
+    tweak = int.from_bytes(child[:32], "big")
+    # invalid for about 1 in 2^127 indices
+    if tweak >= SECP256K1_N or (tweak + key) % SECP256K1_N == 0:
+        raise ValueError(f"BIP32 child {index} is not a valid key")
+    return (tweak + key) % SECP256K1_N, child[32:]
+
+
+def parent_node(mnemonic: str) -> tuple:
+    # BIP39 seed with an empty passphrase, then down PARENT_PATH
+    normalized = unicodedata.normalize("NFKD", " ".join(mnemonic.split()))
+    seed = hashlib.pbkdf2_hmac("sha512", normalized.encode(), b"mnemonic", 2048)
+    master = hmac_sha512(b"Bitcoin seed", seed)
+    key, chain_code = int.from_bytes(master[:32], "big"), master[32:]
+    for index in path_indices(PARENT_PATH):
+        key, chain_code = child_key(key, chain_code, index)
+    return key, chain_code, keys.PrivateKey(key.to_bytes(32, "big")).public_key.to_compressed_bytes()
+
+
+def _derive_range(parent: tuple, start: int, stop: int) -> list:
+    key, chain_code, point = parent
+    records = []
+    for index in range(start, stop):
+        child = child_key(key, chain_code, index, point)[0].to_bytes(32, "big")
+        records.append((index, child, keys.PrivateKey(child).public_key.to_canonical_address()))
+    return records
+
+
+def check_mnemonic(mnemonic: str, index: int, address: bytes):
+    # the public eth-account path validates the words and checksum, and vouches for the bulk derivation above
+    Account.enable_unaudited_hdwallet_features()
+    account = Account.from_mnemonic(mnemonic, account_path=f"{PARENT_PATH}/{index}")
+    if account.address != to_checksum_address(address):
+        raise ValueError(f"Derived address {to_checksum_address(address)} does not match {account.address}")
+
+
+# derived keys and addresses per mnemonic, kept in one AES-GCM encrypted file whose key comes from the password
+# through scrypt; mnemonics are only stored as a hash
+class KeyStore:
+    def __init__(self, path: str, password: str):
+        self.path = path
+        self.password = password
+        self.entries = {}
+
+    @staticmethod
+    def fingerprint(mnemonic: str) -> bytes:
+        return hashlib.sha256(" ".join(mnemonic.split()).encode()).digest()
+
+    def load(self):
+        if not self.password or not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        try:
+            if data[:4] != MAGIC:
+                raise ValueError("not a keystore file")
+            salt, nonce, tag, ciphertext = data[4:20], data[20:32], data[32:48], data[48:]
+            plaintext = AES.new(self._key(salt), AES.MODE_GCM, nonce=nonce).decrypt_and_verify(ciphertext, tag)
+        except ValueError as e:
+            logger.warning(f"Can't read the derived key cache {self.path} ({e}), deriving again")
+            return
+
+        offset = 0
+        while offset < len(plaintext):
+            fingerprint, count = plaintext[offset:offset + 32], int.from_bytes(plaintext[offset + 32:offset + 36], "big")
+            offset += 36
+            records = self.entries.setdefault(fingerprint, {})
+            for index, key, address in RECORD.iter_unpack(plaintext[offset:offset + count * RECORD.size]):
+                records[index] = (key, address)
+            offset += count * RECORD.size
+
+    def save(self):
+        if not self.password:
+            return
+
+        chunks = []
+        for fingerprint, records in self.entries.items():
+            chunks.append(fingerprint + len(records).to_bytes(4, "big"))
+            chunks.extend(RECORD.pack(index, key, address) for index, (key, address) in records.items())
+
+        salt, nonce = os.urandom(16), os.urandom(12)
+        ciphertext, tag = AES.new(self._key(salt), AES.MODE_GCM, nonce=nonce).encrypt_and_digest(b"".join(chunks))
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "wb") as f:
+            f.write(MAGIC + salt + nonce + tag + ciphertext)
+        os.replace(self.path + ".tmp", self.path)
+
+    def _key(self, salt: bytes) -> bytes:
+        return scrypt(self.password, salt, 32, N=2 ** 14, r=8, p=1)
+
+
+# signers for index ranges of a few mnemonics: the seed and the parent node are computed once per mnemonic, the
+# missing indices are derived in chunks (across `processes` workers when > 0) and cached in the keystore
+class HdKeySource:
+    def __init__(self, mnemonics_path: str, keystore: KeyStore, processes: int = 0, chunk_size: int = 1000):
+        self.mnemonics_path = mnemonics_path
+        self.keystore = keystore
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.records = None
+
+    async def stream(self):
+        for key, address in await self.load():
+            yield LocalSigner(key, to_checksum_address(address))
+
+    # every (key, address) of the run in file order, derived or read from the keystore once
+    async def load(self) -> list:
+        if self.records is not None:
+            return self.records
+
+        self.keystore.load()
+        ranges = [parse_line(line) for line in iter_lines(self.mnemonics_path)]
+
+        derived = 0
+        for mnemonic, start, stop in ranges:
+            records = self.keystore.entries.setdefault(KeyStore.fingerprint(mnemonic), {})
+            missing = [index for index in range(start, stop) if index not in records]
+            if missing:
+                for index, key, address in await self._derive(mnemonic, missing[0], missing[-1] + 1):
+                    records[index] = (key, address)
+                await asyncio.to_thread(check_mnemonic, mnemonic, missing[0], records[missing[0]][1])
+                derived += len(missing)
+
+        if derived:
+            logger.info(f"Derived {derived} keys from {len(ranges)} mnemonics")
+            await asyncio.to_thread(self.keystore.save)
+
+        self.records = []
+        for mnemonic, start, stop in ranges:
+            records = self.keystore.entries[KeyStore.fingerprint(mnemonic)]
+            self.records.extend(records[index] for index in range(start, stop))
+        return self.records
+
+    async def _derive(self, mnemonic: str, start: int, stop: int) -> list:
+        parent = await asyncio.to_thread(parent_node, mnemonic)
+        if self.processes <= 0:
+            return await asyncio.to_thread(_derive_range, parent, start, stop)
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(self.processes) as executor:
+            chunks = await asyncio.gather(*(
+                loop.run_in_executor(executor, _derive_range, parent, chunk, min(chunk + self.chunk_size, stop))
+                for chunk in range(start, stop, self.chunk_size)
+            ))
+        return [record for chunk in chunks for record in chunk]
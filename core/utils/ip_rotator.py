@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import aiohttp
+
+from .logger import logger
+
+
+# groups worker attempts behind a mobile proxy into epochs of `accounts_per_ip` leases: once an epoch is used up
+# new leases wait, the in-flight ones drain, a single waiter rotates the IP and probes until the proxy answers again
+class IpRotator:
+    def __init__(self, proxy: str, change_ip_link: str, accounts_per_ip: int = 1, probe_url: str = None,
+                 probe_timeout: float = 60, change_ip_timeout: float = 30, on_rotate=None):
+        self.proxy = proxy
+        self.change_ip_link = change_ip_link
+        self.accounts_per_ip = max(1, accounts_per_ip)
+        self.probe_url = probe_url
+        self.probe_timeout = probe_timeout
+        self.change_ip_timeout = change_ip_timeout
+        self.on_rotate = on_rotate
+
+        # start with a spent epoch so the first lease gets a fresh IP
+        self.used = self.accounts_per_ip
+        self.in_flight = 0
+        self.rotating = False
+        self.rotations = 0
+        self.session = None
+        self._condition = asyncio.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.proxy and self.change_ip_link)
+
+    async def acquire(self) -> bool:
+        if not self.enabled:
+            return False
+
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(
+                    lambda: not self.rotating and (self.used < self.accounts_per_ip or not self.in_flight)
+                )
+                if self.used < self.accounts_per_ip:
+                    self.used += 1
+                    self.in_flight += 1
+                    return True
+                self.rotating = True
+
+            try:
+                await self._rotate()
+            finally:
+                async with self._condition:
+                    self.rotating = False
+                    self.used = 0
+                    self._condition.notify_all()
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def _rotate(self):
+        session = self._session()
+
+        try:
+            async with session.get(self.change_ip_link) as response:
+                await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Failed to change mobile proxy IP: {e!r}")
+            return
+
+        self.rotations += 1
+        if self.on_rotate is not None:
+            await self.on_rotate()
+
+        if self.probe_url:
+            await self._wait_reachable(session)
+
+    async def _wait_reachable(self, session: aiohttp.ClientSession):
+        deadline = time.monotonic() + self.probe_timeout
+
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(self.probe_url, proxy=f"http://{self.proxy}",
+                                       timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    await response.read()
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await asyncio.sleep(1)
+
+        logger.warning(f"Mobile proxy is still unreachable {self.probe_timeout} seconds after changing IP")
+
+    def _session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            # every lease waits behind a rotation, a change-IP link that never answers would stall them all
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.change_ip_timeout))
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
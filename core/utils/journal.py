@@ -0,0 +1,49 @@
+import datetime
+import os
+import sqlite3
+import time
+
+from inputs.config import JOURNAL_FILE_PATH
+
+
+class RunJournal:
+    def __init__(self, path: str = JOURNAL_FILE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS steps ("
+            "address TEXT NOT NULL, day TEXT NOT NULL, step TEXT NOT NULL, tx_hash TEXT, done_at REAL NOT NULL, "
+            "PRIMARY KEY (address, day, step))"
+        )
+        self.conn.commit()
+
+    def completed_steps(self, address: str, day: str = None) -> dict:
+        rows = self.conn.execute(
+            "SELECT step, tx_hash FROM steps WHERE address = ? AND day = ?",
+            (address.lower(), day or RunJournal.today())
+        )
+        return dict(rows.fetchall())
+
+    def is_done(self, address: str, step: str = "done", day: str = None) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM steps WHERE address = ? AND day = ? AND step = ?",
+            (address.lower(), day or RunJournal.today(), step)
+        )
+        return row.fetchone() is not None
+
+    def mark_done(self, address: str, step: str, tx_hash: str = None, day: str = None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO steps (address, day, step, tx_hash, done_at) VALUES (?, ?, ?, ?, ?)",
+            (address.lower(), day or RunJournal.today(), step, tx_hash, time.time())
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def today():
+        return datetime.datetime.now().strftime("%Y-%m-%d")
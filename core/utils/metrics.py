@@ -0,0 +1,214 @@
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import aiohttp
+
+from inputs.config import REPORT_FILE_PATH, TIMINGS_FILE_PATH
+from .result_sink import result_sink
+
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "avg": round(self.sum / self.count, 3) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 3),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class Endpoint:
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = defaultdict(int)
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "latency": self.latency.to_dict(),
+            "statuses": dict(self.statuses),
+            "errors": self.errors,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+
+class Metrics:
+    def __init__(self, timings_path: str = TIMINGS_FILE_PATH):
+        self.timings_path = timings_path
+        self.started_at = time.time()
+        self.endpoints = defaultdict(Endpoint)
+        self.retries = defaultdict(int)
+        self.steps = defaultdict(Histogram)
+
+    @staticmethod
+    def endpoint_name(method: str, url, rpc_method: str = None) -> str:
+        name = f"{method} {url.host}{url.path}"
+        return f"{name} {rpc_method}" if rpc_method else name
+
+    def on_retry(self, retry_state):
+        self.record_retry(retry_state.fn.__qualname__)
+
+    def record_retry(self, name: str):
+        self.retries[name] += 1
+
+    @contextmanager
+    def step(self, address: str, name: str):
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started_at
+            self.steps[name].observe(elapsed)
+            # per-account timings go straight out to a file, holding them for millions of accounts would not fit
+            result_sink.write(self.timings_path, json.dumps({
+                "address": address,
+                "step": name,
+                "seconds": round(elapsed, 3),
+                "at": round(time.time(), 3),
+            }))
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace())
+
+        async def on_request_start(session, ctx, params):
+            ctx.started_at = time.monotonic()
+            ctx.rpc_method = None
+            ctx.bytes_sent = 0
+
+        async def on_request_chunk_sent(session, ctx, params):
+            ctx.bytes_sent += len(params.chunk)
+            # JSON-RPC calls all hit the same url, so the rpc method is what tells them apart
+            if ctx.rpc_method is None and params.chunk[:1] in (b"{", b"["):
+                ctx.rpc_method = Metrics.rpc_method(params.chunk)
+
+        async def on_response_chunk_received(session, ctx, params):
+            # the body is read after on_request_end has fired, so it is added straight to the endpoint
+            name = Metrics.endpoint_name(params.method, params.url, getattr(ctx, "rpc_method", None))
+            self.endpoints[name].bytes_received += len(params.chunk)
+
+        def finish(ctx, params) -> Endpoint:
+            endpoint = self.endpoints[Metrics.endpoint_name(params.method, params.url, ctx.rpc_method)]
+            endpoint.latency.observe(time.monotonic() - ctx.started_at)
+            endpoint.bytes_sent += ctx.bytes_sent
+            return endpoint
+
+        async def on_request_end(session, ctx, params):
+            finish(ctx, params).statuses[params.response.status] += 1
+
+        async def on_request_exception(session, ctx, params):
+            finish(ctx, params).errors += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+        trace_config.on_response_chunk_received.append(on_response_chunk_received)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+    @staticmethod
+    def rpc_method(body: bytes):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if isinstance(payload, list):
+            methods = sorted({call.get("method") for call in payload if isinstance(call, dict)} - {None})
+            return f"batch[{','.join(methods)}]" if methods else None
+        if isinstance(payload, dict):
+            return payload.get("method")
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "duration": round(time.time() - self.started_at, 3),
+            "endpoints": {name: endpoint.to_dict() for name, endpoint in sorted(self.endpoints.items())},
+            "retries": dict(self.retries),
+            "steps": {name: histogram.to_dict() for name, histogram in sorted(self.steps.items())},
+        }
+
+    def to_prometheus(self) -> str:
+        lines = []
+
+        def histogram(metric: str, label: str, value: str, h: Histogram):
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else bound
+                lines.append(f'{metric}_bucket{{{label}="{value}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{label}="{value}"}} {h.sum}')
+            lines.append(f'{metric}_count{{{label}="{value}"}} {h.count}')
+
+        lines.append("# TYPE web3go_request_seconds histogram")
+        for name, endpoint in sorted(self.endpoints.items()):
+            histogram("web3go_request_seconds", "endpoint", name, endpoint.latency)
+
+        lines.append("# TYPE web3go_responses_total counter")
+        for name, endpoint in sorted(self.endpoints.items()):
+            for status, count in sorted(endpoint.statuses.items()):
+                lines.append(f'web3go_responses_total{{endpoint="{name}",status="{status}"}} {count}')
+            lines.append(f'web3go_responses_total{{endpoint="{name}",status="error"}} {endpoint.errors}')
+
+        lines.append("# TYPE web3go_bytes_total counter")
+        for name, endpoint in sorted(self.endpoints.items()):
+            lines.append(f'web3go_bytes_total{{endpoint="{name}",direction="sent"}} {endpoint.bytes_sent}')
+            lines.append(f'web3go_bytes_total{{endpoint="{name}",direction="received"}} {endpoint.bytes_received}')
+
+        lines.append("# TYPE web3go_retries_total counter")
+        for name, count in sorted(self.retries.items()):
+            lines.append(f'web3go_retries_total{{function="{name}"}} {count}')
+
+        lines.append("# TYPE web3go_step_seconds histogram")
+        for name, h in sorted(self.steps.items()):
+            histogram("web3go_step_seconds", "step", name, h)
+
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: str = REPORT_FILE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+
+
+metrics = Metrics()
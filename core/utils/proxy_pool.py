@@ -0,0 +1,110 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import aiohttp
+
+from .logger import logger
+
+FAILURE_STATUSES = (407, 429)
+
+
+class ProxyUnavailable(Exception):
+    pass
+
+
+class ProxyHealth:
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.in_use = 0
+
+
+# per-proxy latency and error rate, a proxy that keeps failing has its circuit opened for `cooldown` seconds,
+# after which it is half-open: it can be handed out again and the first success closes the circuit
+class ProxyPool:
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 60, alpha: float = 0.2):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.health = {}
+
+    def load(self, proxies: list):
+        self.health = {proxy: ProxyHealth() for proxy in proxies}
+
+    async def acquire(self, preferred: str = None):
+        if not self.health:
+            return preferred
+
+        while True:
+            if preferred in self.health and not self.is_open(preferred):
+                proxy = preferred
+                break
+
+            candidates = [proxy for proxy in self.health if not self.is_open(proxy)]
+            if candidates:
+                proxy = min(candidates, key=self.score)
+                break
+
+            reopens_at = min(health.opened_at for health in self.health.values()) + self.cooldown
+            await asyncio.sleep(max(0.1, reopens_at - time.monotonic()))
+
+        self.health[proxy].in_use += 1
+        return proxy
+
+    def release(self, proxy: str):
+        if proxy in self.health:
+            self.health[proxy].in_use -= 1
+
+    def is_open(self, proxy: str) -> bool:
+        health = self.health.get(proxy)
+        return health is not None and health.opened_at is not None and \
+            time.monotonic() - health.opened_at < self.cooldown
+
+    def score(self, proxy: str) -> float:
+        health = self.health[proxy]
+        latency = health.latency if health.latency is not None else 1
+        return latency * (1 + 4 * health.error_rate) * (1 + health.in_use)
+
+    def record(self, proxy: str, ok: bool, latency: float = None):
+        health = self.health.get(proxy)
+        if health is None:
+            return
+
+        health.error_rate = health.error_rate * (1 - self.alpha) + (0 if ok else self.alpha)
+
+        if ok:
+            health.consecutive_failures = 0
+            health.opened_at = None
+            if latency is not None:
+                health.latency = latency if health.latency is None else \
+                    health.latency * (1 - self.alpha) + latency * self.alpha
+            return
+
+        health.consecutive_failures += 1
+        if health.consecutive_failures >= self.failure_threshold and not self.is_open(proxy):
+            health.opened_at = time.monotonic()
+            logger.warning(f"Proxy {proxy} keeps failing, resting it for {self.cooldown} seconds")
+
+    def trace_config(self, proxy: str) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace())
+
+        async def on_request_start(session, ctx, params):
+            ctx.started_at = time.monotonic()
+
+        async def on_request_end(session, ctx, params):
+            ok = params.response.status not in FAILURE_STATUSES
+            self.record(proxy, ok, time.monotonic() - ctx.started_at)
+
+        async def on_request_exception(session, ctx, params):
+            self.record(proxy, False)
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+
+proxy_pool = ProxyPool()
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+
+from inputs.config import RESULTS_FILE_PATH
+
+
+def with_suffix(path: str, suffix: str) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{suffix}{ext}"
+
+
+# collects result lines in memory and appends them from a worker thread, one open per file per flush,
+# either every flush_interval seconds or as soon as flush_size lines are waiting
+class ResultSink:
+    def __init__(self, results_path: str = RESULTS_FILE_PATH, flush_size: int = 500, flush_interval: float = 1):
+        self.results_path = results_path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        # set in shard workers: every file gets a copy per process, appends of several processes would interleave
+        self.suffix = None
+
+        self._buffers = defaultdict(list)
+        self._pending = 0
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+
+    def write(self, path: str, line: str):
+        if self.suffix:
+            path = with_suffix(path, self.suffix)
+        self._buffers[path].append(line + "\n")
+        self._pending += 1
+
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if self._pending >= self.flush_size:
+            self._wakeup.set()
+
+    def record(self, address: str, outcome: str, step: str = None, proxy: str = None, tx_hash: str = None):
+        self.write(self.results_path, json.dumps({
+            "address": address,
+            "proxy": proxy,
+            "step": step,
+            "outcome": outcome,
+            "tx_hash": tx_hash,
+            "at": round(time.time(), 3),
+        }))
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        buffers, self._buffers, self._pending = self._buffers, defaultdict(list), 0
+        await asyncio.to_thread(ResultSink._append, buffers)
+
+    async def close(self):
+        # let the flusher finish its current write instead of cancelling it halfway through a file
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._closing = False
+
+        await self.flush()
+
+    @staticmethod
+    def _append(buffers: dict):
+        for path, lines in buffers.items():
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a") as f:
+                f.writelines(lines)
+
+
+result_sink = ResultSink()
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import aiohttp
+from tenacity import retry, retry_if_exception, stop_after_attempt, stop_after_delay, wait_exponential_jitter
+
+from inputs.config import RETRY_BUDGET
+from .logger import logger
+from .metrics import metrics
+from .proxy_pool import ProxyUnavailable
+from .session_pool import HttpStatusError, RETRYABLE_STATUSES
+
+
+# a run-wide token bucket for retries: every retry spends a token, tokens come back at `rate` per second,
+# so one outage drains it once and further retries are shed instead of hammering a backend that is already down
+class RetryBudget:
+    def __init__(self, capacity: int, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.exhausted = False
+        self.shed = 0
+
+    def spend(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.exhausted = False
+            return True
+
+        if not self.exhausted:
+            self.exhausted = True
+            logger.warning("Retry budget is exhausted, failing fast until it refills")
+        self.shed += 1
+        return False
+
+
+retry_budget = RetryBudget(*RETRY_BUDGET)
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, ProxyUnavailable):
+        # the worker picks another proxy, retrying on this one is pointless
+        return False
+    if isinstance(error, HttpStatusError):
+        return error.status in RETRYABLE_STATUSES
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+
+def should_retry(error: BaseException) -> bool:
+    return is_retryable(error) and retry_budget.spend()
+
+
+def retry_after(base_wait):
+    def wait(retry_state) -> float:
+        error = retry_state.outcome.exception()
+        if isinstance(error, HttpStatusError) and error.retry_after is not None:
+            return min(error.retry_after, 60)
+        return base_wait(retry_state)
+
+    return wait
+
+
+def api_retry(attempts: int, max_delay: float = 120):
+    return retry(
+        stop=stop_after_attempt(attempts) | stop_after_delay(max_delay),
+        wait=retry_after(wait_exponential_jitter(initial=0.5, max=10)),
+        retry=retry_if_exception(should_retry),
+        before_sleep=metrics.on_retry,
+        reraise=True,
+    )
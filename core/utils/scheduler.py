@@ -0,0 +1,154 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import aiohttp
+
+from inputs.config import THREADS, MAX_THREADS, RATE_LIMITS
+from .logger import logger
+
+THROTTLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def slow_down(self):
+        self.rate = max(self.max_rate / 10, self.rate / 2)
+
+    def speed_up(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int = THREADS, min_limit: int = 1, max_limit: int = MAX_THREADS,
+                 cooldown: float = 5):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max(initial, max_limit)
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self._successes = 0
+        self._decreased_at = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def __aexit__(self, *args):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        self._successes += 1
+
+        # additive increase: one more slot per window of `limit` healthy responses
+        if self._successes >= self.limit and self.limit < self.max_limit:
+            self._successes = 0
+            self.limit += 1
+            self._wake()
+
+    def on_throttle(self):
+        now = time.monotonic()
+
+        # multiplicative decrease, at most once per cooldown so one burst of 429s counts once
+        if now - self._decreased_at > self.cooldown and self.limit > self.min_limit:
+            self._decreased_at = now
+            self._successes = 0
+            self.limit = max(self.min_limit, self.limit // 2)
+            logger.warning(f"Backend is throttling, concurrency lowered to {self.limit}")
+
+    def _wake(self):
+        async def notify():
+            async with self._condition:
+                self._condition.notify_all()
+
+        asyncio.get_running_loop().create_task(notify())
+
+
+class Scheduler:
+    def __init__(self, rate_limits: dict = None, latency_spike: float = 4):
+        self.limiter = AdaptiveLimiter()
+        self.buckets = {host: TokenBucket(rate) for host, rate in (rate_limits or {}).items()}
+        self.latency_spike = latency_spike
+        self._latency = {}
+
+    async def before_request(self, host: str):
+        bucket = self.buckets.get(host)
+        if bucket is not None:
+            await bucket.acquire()
+
+    # status None stands for a backend timeout
+    def record(self, host: str, status: int = None, latency: float = None):
+        bucket = self.buckets.get(host)
+
+        if status is None or status in THROTTLE_STATUSES:
+            self.limiter.on_throttle()
+            if bucket is not None and status == 429:
+                bucket.slow_down()
+            return
+
+        baseline = self._latency.get(host)
+        self._latency[host] = latency if baseline is None else baseline * 0.9 + latency * 0.1
+
+        if baseline is not None and latency > baseline * self.latency_spike:
+            self.limiter.on_throttle()
+        else:
+            self.limiter.on_success()
+            if bucket is not None:
+                bucket.speed_up()
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig(
+            trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(connected=False)
+        )
+
+        # the rate limit is waited for by the callers before the request starts, a wait in here would be taken out
+        # of the request's own timeout
+        async def on_request_start(session, ctx, params):
+            ctx.started_at = time.monotonic()
+
+        async def on_connection(session, ctx, params):
+            ctx.connected = True
+
+        async def on_request_end(session, ctx, params):
+            self.record(params.url.host, params.response.status, time.monotonic() - ctx.started_at)
+
+        async def on_request_exception(session, ctx, params):
+            # only a backend that stops answering in time counts, failing to connect (a dead proxy mostly) or a
+            # dropped connection is left to the proxy pool and the retry policy
+            if ctx.connected and isinstance(params.exception, asyncio.TimeoutError):
+                self.record(params.url.host)
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection)
+        trace_config.on_connection_reuseconn.append(on_connection)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+
+scheduler = Scheduler(RATE_LIMITS)
@@ -0,0 +1,162 @@
+import asyncio
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .proxy_pool import ProxyUnavailable
+
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+class HttpStatusError(Exception):
+    def __init__(self, status: int, url, retry_after: float = None):
+        super().__init__(f"{status} from {url}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AccountSession:
+    def __init__(self, pool, proxy: str = None):
+        self.pool = pool
+        self.proxy = proxy
+        self.proxy_pool = pool.proxy_pool
+        self.scheduler = pool.scheduler
+        self.headers = {}
+        self.on_unauthorized = None
+        self._reads = {}
+
+    # looked up on every request, a rotation of the mobile proxy's IP closes the pooled session under the account
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self.pool.client(self.proxy)
+
+    async def request(self, method: str, url: str, **kwargs):
+        # fail fast on a proxy whose circuit is open so the worker can move on to a healthy one
+        if self.proxy_pool is not None and self.proxy_pool.is_open(self.proxy):
+            raise ProxyUnavailable(f"Proxy {self.proxy} is resting after repeated failures")
+
+        # any write may change what the cached reads would return
+        if method != "GET":
+            self._reads.clear()
+
+        extra_headers = kwargs.pop("headers", {})
+        await self.throttle(url)
+        response = await self.session.request(method, url, headers={**self.headers, **extra_headers}, **kwargs)
+
+        if response.status == 401 and self.on_unauthorized is not None:
+            response.release()
+            if await self.on_unauthorized():
+                await self.throttle(url)
+                response = await self.session.request(method, url, headers={**self.headers, **extra_headers}, **kwargs)
+
+        # throttling and server errors never carry a usable body, surface them for the retry policy
+        if response.status in RETRYABLE_STATUSES:
+            response.release()
+            raise HttpStatusError(response.status, url, AccountSession.retry_after(response))
+
+        return response
+
+    async def throttle(self, url: str):
+        # outside the request, so waiting for the host's rate limit doesn't eat into the request timeout
+        if self.scheduler is not None:
+            await self.scheduler.before_request(urlparse(url).hostname)
+
+    @staticmethod
+    def retry_after(response):
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    async def get_json(self, url: str):
+        # concurrent and repeated reads of the same url share one request until the next write
+        read = self._reads.get(url)
+        if read is None:
+            read = self._reads[url] = asyncio.ensure_future(self._read_json(url))
+
+        try:
+            ok, data = await asyncio.shield(read)
+        except Exception:
+            self._forget(url, read)
+            raise
+
+        if not ok:
+            self._forget(url, read)
+        return data
+
+    async def _read_json(self, url: str) -> tuple:
+        response = await self.get(url)
+        return response.ok, await response.json()
+
+    def _forget(self, url: str, read: asyncio.Future):
+        if self._reads.get(url) is read:
+            del self._reads[url]
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+
+class SessionPool:
+    def __init__(self, headers: dict = None, limit_per_host: int = 10, keepalive_timeout: int = 60,
+                 trace_configs: list = None, proxy_pool=None, timeout: float = None, scheduler=None):
+        self.headers = headers or {}
+        self.trace_configs = trace_configs or []
+        self.proxy_pool = proxy_pool
+        self.scheduler = scheduler
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._sessions = {}
+
+    def get(self, proxy: str = None) -> AccountSession:
+        return AccountSession(self, proxy)
+
+    def client(self, proxy: str = None) -> aiohttp.ClientSession:
+        session = self._sessions.get(proxy)
+
+        if session is None or session.closed:
+            connector_kwargs = {
+                "limit_per_host": self.limit_per_host,
+                "keepalive_timeout": self.keepalive_timeout,
+                "ttl_dns_cache": 300,
+            }
+            if proxy:
+                from aiohttp_socks import ProxyConnector
+
+                connector = ProxyConnector.from_url(f'http://{proxy}', **connector_kwargs)
+            else:
+                connector = aiohttp.TCPConnector(**connector_kwargs)
+
+            trace_configs = list(self.trace_configs)
+            if self.proxy_pool is not None and proxy:
+                trace_configs.append(self.proxy_pool.trace_config(proxy))
+
+            # many accounts share this session, cookies one of them gets must not go out with the others' requests
+            session = aiohttp.ClientSession(
+                headers=self.headers,
+                trust_env=True,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=trace_configs
+            )
+            self._sessions[proxy] = session
+
+        return session
+
+    async def reset(self, proxy: str = None):
+        session = self._sessions.pop(proxy, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def close(self):
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
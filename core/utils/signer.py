@@ -0,0 +1,123 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from .file_to_list import file_to_list
+
+# worker process state: keys are read from the keys file inside each worker and never sent back
+_keys = []
+_accounts = {}
+
+
+def _init_worker(keys_path: str):
+    global _keys
+    _keys = file_to_list(keys_path)
+
+
+def _account(index: int):
+    if index not in _accounts:
+        _accounts[index] = Account.from_key(_keys[index])
+    return _accounts[index]
+
+
+def _count_keys() -> int:
+    return len(_keys)
+
+
+def _derive_addresses(start: int, stop: int) -> list:
+    return [_account(i).address for i in range(start, min(stop, len(_keys)))]
+
+
+def _sign_message(index: int, msg: str) -> str:
+    return _account(index).sign_message(encode_defunct(text=msg)).signature.hex()
+
+
+def _sign_transaction(index: int, transaction: dict):
+    return _account(index).sign_transaction(transaction)
+
+
+# one of these lives for every account of the run, so it keeps only the raw key and the address and signs through
+# the stateless Account helpers instead of holding a LocalAccount
+class LocalSigner:
+    __slots__ = ("key", "address", "label")
+
+    # keys derived elsewhere come with their address, so the costly public key computation is skipped
+    def __init__(self, key, address: str = None):
+        if address is None:
+            account = Account.from_key(key)
+            key, address = bytes(account.key), account.address
+        self.key = key
+        self.address = address
+        # every log line of the account carries it, so it is built once rather than hexing the key each time
+        self.label = f"Key: ...{self.key_hex[30:]}"
+
+    @property
+    def key_hex(self) -> str:
+        return "0x" + self.key.hex()
+
+    def __str__(self):
+        return f"{self.address[:10]}...{self.address[-10:]}"
+
+    async def sign_message(self, msg: str) -> str:
+        return Account.sign_message(encode_defunct(text=msg), self.key).signature.hex()
+
+    async def sign_transaction(self, transaction: dict):
+        return Account.sign_transaction(transaction, self.key)
+
+
+class PooledSigner:
+    __slots__ = ("pool", "index", "address", "label")
+
+    key_hex = None
+
+    def __init__(self, pool: "ProcessSigner", index: int, address: str):
+        self.pool = pool
+        self.index = index
+        self.address = address
+        self.label = f"Account #{index} {address}"
+
+    def __str__(self):
+        return f"{self.address[:10]}...{self.address[-10:]}"
+
+    async def sign_message(self, msg: str) -> str:
+        return await self.pool.run(_sign_message, self.index, msg)
+
+    async def sign_transaction(self, transaction: dict):
+        return await self.pool.run(_sign_transaction, self.index, transaction)
+
+
+class ProcessSigner:
+    def __init__(self, keys_path: str, processes: int, chunk_size: int = 500):
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(keys_path,))
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def stream(self):
+        # every worker reads the same keys file, derivation is split across them in index chunks
+        # and the next chunk is derived while the current one is being handed out
+        total = await self.count()
+        starts = range(0, total, self.chunk_size)
+        chunk = self._derive(starts[0]) if starts else None
+
+        for i, start in enumerate(starts):
+            next_chunk = self._derive(starts[i + 1]) if i + 1 < len(starts) else None
+            for offset, address in enumerate(await chunk):
+                yield PooledSigner(self, start + offset, address)
+            chunk = next_chunk
+
+    async def count(self) -> int:
+        return await self.run(_count_keys)
+
+    async def signers(self, start: int, stop: int) -> list:
+        addresses = await self.run(_derive_addresses, start, stop)
+        return [PooledSigner(self, start + offset, address) for offset, address in enumerate(addresses)]
+
+    def _derive(self, start: int) -> asyncio.Future:
+        return asyncio.ensure_future(self.run(_derive_addresses, start, start + self.chunk_size))
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
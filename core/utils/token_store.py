@@ -0,0 +1,90 @@
+import base64
+import glob
+import json
+import os
+import time
+
+from inputs.config import TOKENS_FILE_PATH
+from .result_sink import result_sink, with_suffix
+
+
+class TokenStore:
+    def __init__(self, path: str = TOKENS_FILE_PATH, leeway: int = 300):
+        self.path = path
+        self.leeway = leeway
+        # shard workers only append, rewriting the shared file from several processes at once would lose rows
+        self.compacts = True
+        self._tokens = None
+
+    def get(self, address: str):
+        token, expires_at = self._load().get(address.lower(), (None, 0))
+        if token and expires_at - self.leeway > time.time():
+            return token
+
+    def save(self, address: str, token: str):
+        expires_at = TokenStore.get_expiry(token)
+        if expires_at is None:
+            return
+
+        self._load()[address.lower()] = (token, expires_at)
+        self._append({"address": address.lower(), "token": token, "exp": expires_at})
+
+    def drop(self, address: str):
+        if self._load().pop(address.lower(), None):
+            self._append({"address": address.lower(), "token": None, "exp": 0})
+
+    def _load(self) -> dict:
+        if self._tokens is not None:
+            return self._tokens
+
+        # shard workers append to tokens.<worker>.jsonl next to the main file, the newest row of an address wins
+        siblings = sorted(glob.glob(with_suffix(glob.escape(self.path), "*")), key=os.path.getmtime)
+
+        self._tokens = {}
+        for path in [self.path, *siblings]:
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._tokens[row["address"]] = (row["token"], row["exp"])
+
+        if self.compacts and (siblings or os.path.exists(self.path)):
+            self._compact()
+            for path in siblings:
+                os.remove(path)
+
+        return self._tokens
+
+    # folds what shard workers of an earlier run appended back into the main file
+    def merge(self):
+        self._tokens = None
+        self._load()
+
+    def _append(self, row: dict):
+        # buffered with the result lines and appended off the event loop, the in-memory copy is already current
+        result_sink.write(self.path, json.dumps(row))
+
+    def _compact(self):
+        now = time.time()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            for address, (token, expires_at) in self._tokens.items():
+                if token and expires_at > now:
+                    f.write(json.dumps({"address": address, "token": token, "exp": expires_at}) + "\n")
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def get_expiry(token: str):
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return int(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+        except (IndexError, ValueError, KeyError, TypeError):
+            return None
+
+
+token_store = TokenStore()
@@ -1,11 +1,11 @@
 from eth_account import Account
 from eth_account.messages import encode_defunct, SignableMessage, encode_structured_data
-from web3 import Web3
 
 
 class Web3Utils:
     def __init__(self, http_provider: str = 'https://eth.llamarpc.com', mnemonic: str = None, key: str = None):
-        self.w3 = None
+        self.http_provider = None
+        self._w3 = None
         Account.enable_unaudited_hdwallet_features()
 
         if mnemonic:
@@ -20,15 +20,25 @@ class Web3Utils:
     def __str__(self):
         return f"{self.acct.address[:10]}...{self.acct.address[-10:]}"
 
+    # the provider (and web3 itself) is only built once something needs the chain, signing works without it
+    @property
+    def w3(self):
+        if self._w3 is None:
+            from web3 import Web3
+
+            self._w3 = Web3(Web3.HTTPProvider(self.http_provider))
+        return self._w3
+
     def define_new_provider(self, http_provider: str):
-        self.w3 = Web3(Web3.HTTPProvider(http_provider))
+        self.http_provider = http_provider
+        self._w3 = None
 
     def create_wallet(self):
         self.acct, self.mnemonic = Account.create_with_mnemonic()
         return self.acct, self.mnemonic
 
     def sign(self, encoded_msg: SignableMessage):
-        return self.w3.eth.account.sign_message(encoded_msg, self.acct.key)
+        return Account.sign_message(encoded_msg, self.acct.key)
 
     def get_signed_code(self, msg) -> str:
         return self.sign(encode_defunct(text=msg)).signature.hex()
@@ -0,0 +1,142 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+from inputs.config import QUEUE_FILE_PATH, SHARD_LEASE_TIMEOUT
+
+
+# one row per account position of the day's run: workers lease a batch of pending positions, mark each one running
+# before they start it and done when it is handled; an idle worker steals half of the largest pending backlog another
+# worker still holds, and leases that stop being refreshed (a crashed worker) are handed out again
+class WorkQueue:
+    def __init__(self, path: str = QUEUE_FILE_PATH, lease_timeout: float = SHARD_LEASE_TIMEOUT):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.lease_timeout = lease_timeout
+        self.lock = threading.Lock()
+        # the default rollback journal only needs file locks, so the file can live on a disk several hosts share
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            "day TEXT NOT NULL, position INTEGER NOT NULL, batch INTEGER NOT NULL, state TEXT NOT NULL, "
+            "worker TEXT, leased_until REAL, ok INTEGER, PRIMARY KEY (day, position))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS accounts_state ON accounts (day, state, worker)")
+
+    def seed(self, total: int, batch_size: int, day: str = None):
+        # every worker seeds, positions that are already queued keep their state
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO accounts (day, position, batch, state) VALUES (?, ?, ?, 'pending')",
+                ((day or WorkQueue.today(), position, position // batch_size) for position in range(total))
+            )
+            self.conn.execute("COMMIT")
+
+    def lease(self, worker: str, day: str = None) -> list:
+        day = day or WorkQueue.today()
+        now = time.time()
+
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                positions = self._free_batch(day, now) or self._steal(day, worker)
+                self.conn.executemany(
+                    "UPDATE accounts SET state = 'pending', worker = ?, leased_until = ? WHERE day = ? AND position = ?",
+                    ((worker, now + self.lease_timeout, day, position) for position in positions)
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        return sorted(positions)
+
+    def _free_batch(self, day: str, now: float) -> list:
+        row = self.conn.execute(
+            "SELECT batch FROM accounts WHERE day = ? AND state != 'done' AND (worker IS NULL OR leased_until < ?) "
+            "ORDER BY position LIMIT 1",
+            (day, now)
+        ).fetchone()
+        if row is None:
+            return []
+
+        rows = self.conn.execute(
+            "SELECT position FROM accounts WHERE day = ? AND batch = ? AND state != 'done' "
+            "AND (worker IS NULL OR leased_until < ?)",
+            (day, row[0], now)
+        )
+        return [position for position, in rows.fetchall()]
+
+    def _steal(self, day: str, worker: str) -> list:
+        row = self.conn.execute(
+            "SELECT worker, COUNT(*) FROM accounts WHERE day = ? AND state = 'pending' AND worker != ? "
+            "GROUP BY worker ORDER BY COUNT(*) DESC LIMIT 1",
+            (day, worker)
+        ).fetchone()
+        if row is None or row[1] < 2:
+            return []
+
+        # the tail of the victim's backlog, the part it would get to last
+        rows = self.conn.execute(
+            "SELECT position FROM accounts WHERE day = ? AND state = 'pending' AND worker = ? "
+            "ORDER BY position DESC LIMIT ?",
+            (day, row[0], row[1] // 2)
+        )
+        return [position for position, in rows.fetchall()]
+
+    def claim(self, position: int, worker: str, day: str = None) -> bool:
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE accounts SET state = 'running', leased_until = ? "
+                "WHERE day = ? AND position = ? AND worker = ? AND state = 'pending'",
+                (time.time() + self.lease_timeout, day or WorkQueue.today(), position, worker)
+            )
+        return cursor.rowcount == 1
+
+    def finish(self, position: int, ok: bool, day: str = None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE accounts SET state = 'done', ok = ? WHERE day = ? AND position = ?",
+                (int(ok), day or WorkQueue.today(), position)
+            )
+
+    def heartbeat(self, worker: str, day: str = None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE accounts SET leased_until = ? WHERE day = ? AND worker = ? AND state != 'done'",
+                (time.time() + self.lease_timeout, day or WorkQueue.today(), worker)
+            )
+
+    def release(self, worker: str, day: str = None):
+        # hands back what was leased but never started so other workers don't wait for the lease to expire
+        with self.lock:
+            self.conn.execute(
+                "UPDATE accounts SET worker = NULL, leased_until = NULL "
+                "WHERE day = ? AND worker = ? AND state = 'pending'",
+                (day or WorkQueue.today(), worker)
+            )
+
+    def remaining(self, day: str = None) -> int:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM accounts WHERE day = ? AND state != 'done'", (day or WorkQueue.today(),)
+            ).fetchone()
+        return row[0]
+
+    def summary(self, day: str = None) -> tuple:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(ok), 0) FROM accounts WHERE day = ? AND state = 'done'",
+                (day or WorkQueue.today(),)
+            ).fetchone()
+        return row
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def today():
+        return datetime.datetime.now().strftime("%Y-%m-%d")
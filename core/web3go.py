@@ -1,67 +1,101 @@
 import asyncio
 import datetime
-import json
 import random
 
 import aiohttp
-from aiohttp_socks import ProxyType, ProxyConnector, ChainProxyConnector
-from tenacity import retry, stop_after_attempt, stop_after_delay
-from web3 import Web3
-from web3.exceptions import TimeExhausted
 
 from inputs import config
-from inputs.config import MOBILE_PROXY_CHANGE_IP_LINK, MOBILE_PROXY
-from .utils import Web3Utils, logger
-from .utils.file_manager import str_to_file
-
-
+from inputs.config import (
+    MOBILE_PROXY_CHANGE_IP_LINK, MOBILE_PROXY, MOBILE_PROXY_ACCOUNTS_PER_IP, API_URL, REQUEST_TIMEOUT,
+    FEE_ESCALATE_BLOCKS
+)
+from . import chain
+from .utils import logger
+from .utils.ip_rotator import IpRotator
+from .utils.metrics import metrics
+from .utils.proxy_pool import proxy_pool
+from .utils.result_sink import result_sink
+from .utils.retry_policy import api_retry
+from .utils.scheduler import scheduler
+from .utils.session_pool import SessionPool
+from .utils.token_store import token_store
+
+
+HEADERS = {
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'uk-UA,uk;q=0.9',
+    'Connection': 'keep-alive',
+    'Origin': 'https://reiki.web3go.xyz',
+    'Referer': 'https://reiki.web3go.xyz/taskboard',
+    'Sec-Fetch-Dest': 'empty',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Site': 'same-origin',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'X-App-Channel': 'DIN',
+    'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+}
+
+session_pool = SessionPool(
+    HEADERS,
+    trace_configs=[scheduler.trace_config(), metrics.trace_config()],
+    proxy_pool=proxy_pool,
+    timeout=REQUEST_TIMEOUT,
+    scheduler=scheduler
+)
+
+# connections opened through the old IP are dropped on every rotation
+ip_rotator = IpRotator(
+    MOBILE_PROXY,
+    MOBILE_PROXY_CHANGE_IP_LINK,
+    accounts_per_ip=MOBILE_PROXY_ACCOUNTS_PER_IP,
+    probe_url=API_URL,
+    on_rotate=lambda: session_pool.reset(MOBILE_PROXY)
+)
+
+
+# one record per account for the whole run: headers, connections and the RPC client are shared module-level
+# singletons, an attempt only swaps the proxy and the pooled session it points at
 class Web3Go:
-    def __init__(self, key: str, proxy: str = None):
-        self.web3_utils = Web3Utils(key=key)
-        # self.proxy = f'http://{proxy}' if proxy else None
+    __slots__ = ("signer", "proxy", "session")
 
-        self.headers = {
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'uk-UA,uk;q=0.9',
-            'Connection': 'keep-alive',
-            'Origin': 'https://reiki.web3go.xyz',
-            'Referer': 'https://reiki.web3go.xyz/taskboard',
-            'Sec-Fetch-Dest': 'empty',
-            'Sec-Fetch-Mode': 'cors',
-            'Sec-Fetch-Site': 'same-origin',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'X-App-Channel': 'DIN',
-            'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-platform': '"Windows"',
-        }
+    def __init__(self, signer, proxy: str = None):
+        self.signer = signer
+        # self.proxy = f'http://{proxy}' if proxy else None
 
         self.session = None
         self.proxy = proxy
 
     async def define_proxy(self, proxy: str):
         if MOBILE_PROXY:
-            await Web3Go.change_ip()
             self.proxy = MOBILE_PROXY
 
         if proxy is not None:
             self.proxy = proxy
 
-        connector = self.proxy and ProxyConnector.from_url(f'http://{self.proxy}')
-        self.session = aiohttp.ClientSession(
-            headers=self.headers,
-            trust_env=True,
-            connector=connector
-        )
-
-    @staticmethod
-    async def change_ip():
-        async with aiohttp.ClientSession() as session:
-            await session.get(MOBILE_PROXY_CHANGE_IP_LINK)
+        self.session = session_pool.get(self.proxy)
 
-    @retry(stop=stop_after_attempt(20))
     async def login(self):
-        url = 'https://reiki.web3go.xyz/api/account/web3/web3_challenge'
+        address = self.signer.address
+        auth_token = token_store.get(address)
+
+        if auth_token:
+            self.upd_login_token(auth_token)
+            self.session.on_unauthorized = self.relogin
+            return True
+
+        return await self.sign_in()
+
+    async def relogin(self):
+        self.session.on_unauthorized = None
+        self.session.headers.pop("Authorization", None)
+        token_store.drop(self.signer.address)
+        return await self.sign_in()
+
+    @api_retry(20)
+    async def sign_in(self):
+        url = f"{API_URL}/account/web3/web3_challenge"
         params = await self.get_login_params()
         address = params["address"]
         nonce = params["nonce"]
@@ -71,7 +105,7 @@ class Web3Go:
             'address': address,
             'nonce': nonce,
             'challenge': '{"msg":"' + msg.replace('\n', '\\n') + '"}',
-            'signature': self.web3_utils.get_signed_code(msg),
+            'signature': await self.signer.sign_message(msg),
         }
 
         response = await self.session.post(url, json=json_data)
@@ -81,15 +115,16 @@ class Web3Go:
 
         if auth_token:
             self.upd_login_token(auth_token)
+            token_store.save(address, auth_token)
 
         return bool(auth_token)
 
-    @retry(stop=stop_after_attempt(20))
+    @api_retry(20)
     async def get_login_params(self):
-        url = 'https://reiki.web3go.xyz/api/account/web3/web3_nonce'
+        url = f"{API_URL}/account/web3/web3_nonce"
 
         json_data = {
-            'address': self.web3_utils.acct.address,
+            'address': self.signer.address,
         }
 
         response = await self.session.post(url, json=json_data, ssl=False)
@@ -99,9 +134,9 @@ class Web3Go:
     def upd_login_token(self, token: str):
         self.session.headers["Authorization"] = f"Bearer {token}"
 
-    @retry(stop=stop_after_attempt(20))
+    @api_retry(20)
     async def claim(self):
-        url = 'https://reiki.web3go.xyz/api/checkin'
+        url = f"{API_URL}/checkin"
 
         params = {
             'day': self.get_current_date(),
@@ -116,30 +151,28 @@ class Web3Go:
         leafs = await self.get_leaf_amount()
 
         if leafs < lottery_step:
-            logger.info(f"{self.web3_utils} | Not enough leafs to spin: {leafs} leafs")
+            logger.info(f"{self.signer} | Not enough leafs to spin: {leafs} leafs")
             return
 
         while leafs >= lottery_step:
             await asyncio.sleep(random.uniform(3, 5))
             prize = await self.spin_lottery()
             leafs -= lottery_step
-            logger.info(f"{self.web3_utils} | Prize: {prize} | Leafs left: {leafs}")
+            logger.info(f"{self.signer} | Prize: {prize} | Leafs left: {leafs}")
 
-    @retry(stop=stop_after_attempt(5))
+    @api_retry(5)
     async def get_lottery_result(self):
-        url = 'https://reiki.web3go.xyz/api/lottery/offchain'
-
-        response = await self.session.get(url)
+        url = f"{API_URL}/lottery/offchain"
 
-        return await response.json()
+        return await self.session.get_json(url)
 
     async def get_leaf_amount(self):
         resp_json = await self.get_lottery_result()
         return resp_json["userGoldLeafCount"]
 
-    @retry(stop=stop_after_attempt(5))
+    @api_retry(5)
     async def spin_lottery(self):
-        url = "https://reiki.web3go.xyz/api/lottery/try"
+        url = f"{API_URL}/lottery/try"
 
         response = await self.session.post(url)
         resp_json = await response.json()
@@ -147,7 +180,7 @@ class Web3Go:
         return resp_json["prize"]
 
     async def logout(self):
-        await self.session.close()
+        self.session.headers.pop("Authorization", None)
 
     @staticmethod
     def get_current_date():
@@ -158,9 +191,9 @@ class Web3Go:
         return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
 
     def logs(self, file_name: str, msg_result: str = ""):
-        address = self.web3_utils.acct.address
-        file_msg = f"{address}|{self.proxy}"
-        str_to_file(f"./logs/{file_name}.txt", file_msg)
+        address = self.signer.address
+        result_sink.write(f"./logs/{file_name}.txt", f"{address}|{self.proxy}")
+        result_sink.record(address, file_name, proxy=self.proxy)
         msg_result = msg_result and " | " + str(msg_result)
 
         if file_name == "success":
@@ -168,57 +201,74 @@ class Web3Go:
         else:
             logger.error(f"{address}{msg_result}")
 
-    @retry(stop=stop_after_attempt(5))
+    @api_retry(5)
     async def get_minted_balance(self):
-        response = await self.session.get("https://reiki.web3go.xyz/api/lottery/mint/info", proxy=self.proxy)
-        json_data = await response.json()
+        json_data = await self.session.get_json(f"{API_URL}/lottery/mint/info")
         minted_chip = json_data.get("mintedChip")
         minted_piece = json_data.get("mintedPiece")
         wafer = json_data.get("wafer")
         logger.info(
-            f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | minted balance: chip: {minted_chip}, piece: {minted_piece}, wafer: {wafer}")
+            f"{self.signer.label} | minted balance: chip: {minted_chip}, piece: {minted_piece}, wafer: {wafer}")
         return minted_chip, minted_piece
 
-    @retry(stop=stop_after_attempt(5))
+    @api_retry(5)
     async def get_lottery_balance(self, print:bool):
-        response = await self.session.get("https://reiki.web3go.xyz/api/lottery/offchain", proxy=self.proxy)
-        json_data = await response.json()
+        json_data = await self.session.get_json(f"{API_URL}/lottery/offchain")
         leaves = json_data.get("userGoldLeafCount")
         chip = json_data.get("chipNum")
         piece = json_data.get("pieceNum")
         if print:
-            logger.info(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Balance: leaves: {leaves}, chip: {chip}, piece: {piece}")
+            logger.info(f"{self.signer.label} | Balance: leaves: {leaves}, chip: {chip}, piece: {piece}")
         return leaves, chip, piece
 
 
     async def mint_chip_and_pieces(self):
         try:
             leaves_balance, unminted_chip, unminted_piece = await self.get_lottery_balance(print=False)
-            logger.info(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | unminted_chip = {unminted_chip}, unminted_piece = {unminted_piece}")
+            logger.info(f"{self.signer.label} | unminted_chip = {unminted_chip}, unminted_piece = {unminted_piece}")
             minted_chip, minted_piece = await self.get_minted_balance()
+            mints = []
             if unminted_chip > 0:
                 chip_amount_to_mint = unminted_chip
-                logger.info(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | need to mint {chip_amount_to_mint} chips")
-                await self.mint(chip=True, amount=chip_amount_to_mint)
-                await asyncio.sleep(2)
+                logger.info(f"{self.signer.label} | need to mint {chip_amount_to_mint} chips")
+                mints.append((True, chip_amount_to_mint))
             if unminted_piece > 0:
                 piece_amount_to_mint = unminted_piece
                 logger.info(
-                    f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | need to mint {piece_amount_to_mint} pieces")
-                await self.mint(chip=False, amount=piece_amount_to_mint)
+                    f"{self.signer.label} | need to mint {piece_amount_to_mint} pieces")
+                mints.append((False, piece_amount_to_mint))
+            if mints:
+                # nonces are taken in order up front, each mint goes out as soon as the node accepted the one before
+                # it (never behind a rejected one, that would leave a nonce gap) and all of them are confirmed together
+                infos = await asyncio.gather(*(self.get_info_for_mint(chip=chip, amount=amount) for chip, amount in mints))
+                address = self.signer.address
+                nonces = [await chain.nonce_manager.next_nonce(address) for _ in mints]
+
+                sends = []
+                previous = None
+                for (chip, amount), info, tx_nonce in zip(mints, infos, nonces):
+                    accepted = asyncio.get_running_loop().create_future()
+                    sends.append(self.mint(chip=chip, amount=amount, info=info, tx_nonce=tx_nonce,
+                                           previous=previous, accepted=accepted))
+                    previous = accepted
+                results = await asyncio.gather(*sends)
                 await asyncio.sleep(2)
-            if unminted_piece == 0 and unminted_chip == 0:
-                logger.info(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | nothing to mint, minted_chips = {minted_chip}, minted_pieces = {minted_piece}")
-                return
+                if all(result for result, _ in results):
+                    return [tx_hash for _, tx_hash in results]
+            else:
+                logger.info(f"{self.signer.label} | nothing to mint, minted_chips = {minted_chip}, minted_pieces = {minted_piece}")
+                return []
         except Exception as e:
+            # nonces may have been taken for mints that never went out
+            chain.nonce_manager.resync(self.signer.address)
             logger.error(f" {e}")
             await asyncio.sleep(2)
 
-    @retry(stop=stop_after_attempt(5))
+    @api_retry(5)
     async def get_info_for_mint(self, chip: bool, amount):
         json_data = {
             'addressThis': '0x00a9De8Af37a3179d7213426E78Be7DFb89F2b19' if chip else '0x2c085411ca401a84a9D98DEc415282FA239D53bB',
-            'chainId': 204,
+            'chainId': chain.CHAIN_ID,
             'type': 'chip' if chip else 'chipPiece'
         }
         if chip:
@@ -226,7 +276,7 @@ class Web3Go:
         else:
             json_data['numPieces'] = amount
 
-        response = await self.session.post("https://reiki.web3go.xyz/api/lottery/claim", proxy=self.proxy, json = json_data)
+        response = await self.session.post(f"{API_URL}/lottery/claim", json = json_data)
         responce_json = await response.json()
         result = responce_json.get("result")
         if result:
@@ -235,224 +285,220 @@ class Web3Go:
             event_id = responce_json.get("eventId")
             return nonce, signature, event_id
         else:
-            logger.error(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | something went wrong with mint info: {responce_json}")
+            logger.error(f"{self.signer.label} | something went wrong with mint info: {responce_json}")
 
-    @retry(stop=stop_after_attempt(5))
+    @api_retry(5)
     async def finalize_mint_request(self, event_id):
         json_data = {
             'eventId': event_id
         }
 
-        response = await self.session.post("https://reiki.web3go.xyz/api/lottery/claimSuccess", proxy=self.proxy, json = json_data)
+        response = await self.session.post(f"{API_URL}/lottery/claimSuccess", json = json_data)
         responce_json = await response.json()
         result = responce_json.get("result")
         if result:
             return True
         else:
-            logger.error(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | something went wrong with claimSucces: {responce_json}")
-    async def mint(self, chip: bool, amount):
-        nonce, signature, event_id = await self.get_info_for_mint(chip=chip, amount=amount)
-        w3_opbnb = Web3(Web3.HTTPProvider(
-            'https://opbnb-mainnet-rpc.bnbchain.org'))
-
-        chip_contract_address = w3_opbnb.to_checksum_address("0x00a9De8Af37a3179d7213426E78Be7DFb89F2b19")
-        with open('inputs/chip_abi.json', 'r') as f:
-            chip_abi = json.load(f)
-        chip_contract = w3_opbnb.eth.contract(address=chip_contract_address, abi=chip_abi)
-
-        piece_contract_address = w3_opbnb.to_checksum_address("0x2c085411ca401a84a9D98DEc415282FA239D53bB")
-        with open('inputs/piece_abi.json', 'r') as f:
-            piece_abi = json.load(f)
-        piece_contract = w3_opbnb.eth.contract(address=piece_contract_address, abi=piece_abi)
+            logger.error(f"{self.signer.label} | something went wrong with claimSucces: {responce_json}")
+    async def mint(self, chip: bool, amount, info: tuple = None, tx_nonce: int = None,
+                   previous: asyncio.Future = None, accepted: asyncio.Future = None):
+        try:
+            nonce, signature, event_id = info or await self.get_info_for_mint(chip=chip, amount=amount)
+            address = self.signer.address
+            if tx_nonce is None:
+                tx_nonce = await chain.nonce_manager.next_nonce(address)
+
+            if chip:
+                transaction = chain.tx_builder.chip_mint(address, tx_nonce, int(nonce, 16), signature)
+            else:
+                transaction = chain.tx_builder.piece_claim(address, tx_nonce, amount, int(nonce, 16), signature)
+
+            result, tx_hash = await self.send_transaction(transaction, "Mint transaction sent",
+                                                          gas_shape=None if chip else amount,
+                                                          previous=previous, accepted=accepted)
+            if result:
+                await self.finalize_mint_request(event_id)
+            return result, tx_hash
+        finally:
+            # a mint that failed before it was broadcast must not hold back the ones queued behind it
+            if accepted is not None and not accepted.done():
+                accepted.set_result(False)
+
+    async def send_to_master(self, balance: int = None):
+        # nothing pre-scanned to transfer, no chain call at all
+        if balance == 0:
+            return
 
-        if chip:
-            transaction = chip_contract.functions.safeBuyToken(addressThis=chip_contract_address,
-                                                    _commodityToken=w3_opbnb.to_checksum_address("0xe5116e725a8c1bf322df6f5842b73102f3ef0cee"),
-                                                    toAddress=self.web3_utils.acct.address,
-                                                    chainId=204,
-                                                    nonce=int(nonce, 16),
-                                                   flatSig=signature).build_transaction({
-                'value': 0,
-                'from': self.web3_utils.acct.address,
-                'nonce': w3_opbnb.eth.get_transaction_count(self.web3_utils.acct.address),
-                'type': '0x2',
-                'chainId': 204
-            })
-        else:
-            transaction = piece_contract.functions.claim(addressThis=piece_contract_address,
-                                                               toAddress=self.web3_utils.acct.address,
-                                                               tokenId=0,
-                                                               numPieces=amount,
-                                                               chainId=204,
-                                                               nonce=int(nonce, 16),
-                                                               flatSig=signature).build_transaction({
-                'value': 0,
-                'from': self.web3_utils.acct.address,
-                'nonce': w3_opbnb.eth.get_transaction_count(self.web3_utils.acct.address),
-                'type': '0x2',
-                'chainId': 204
-            })
-
-        estimated_gas = w3_opbnb.eth.estimate_gas(transaction)
-        transaction['maxFeePerGas'] = w3_opbnb.to_wei(0.000010009, "gwei")
-        transaction['maxPriorityFeePerGas'] = w3_opbnb.to_wei(0.00001, "gwei")
-        transaction['gas'] = estimated_gas
-        signed = self.web3_utils.acct.sign_transaction(transaction)
-        # send transaction
-        for _ in range(3):
-            try:
-                tx_hash = w3_opbnb.eth.send_raw_transaction(signed.rawTransaction)
-                receipt = w3_opbnb.eth.wait_for_transaction_receipt(tx_hash, timeout=240)
-                if receipt.status == 1:
-                    logger.info(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Mint transaction sent. Hash: {tx_hash.hex()}.")
-                    await asyncio.sleep(10)
-                    await self.finalize_mint_request(event_id)
-                    return True, tx_hash.hex()
-                else:
-                    logger.error(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Transaction failed, hash: {tx_hash.hex()}.")
-                    return False, tx_hash.hex()
-            except TimeExhausted as te:
-                logger.error(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Error checking transaction: {te}. Trying again...")
-            except ValueError as ve:
-                logger.warning(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Not enough opBNB balance")
-                logger.debug(ve)
-                with open('no_balance_in_opbnb.txt',
-                          'a') as file:
-                    file.write(f"{self.web3_utils.acct.key.hex()} | {self.web3_utils.acct.address}\n")
-                break
-        logger.error(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Did not manage to send transaction")
-        return False, None
-
-    async def send_to_master(self):
-        w3_opbnb = Web3(Web3.HTTPProvider(
-            'https://opbnb-mainnet-rpc.bnbchain.org'))
-        piece_contract_address = w3_opbnb.to_checksum_address("0x2c085411ca401a84a9D98DEc415282FA239D53bB")
-        with open('inputs/piece_abi.json', 'r') as f:
-            piece_abi = json.load(f)
-        piece_contract = w3_opbnb.eth.contract(address=piece_contract_address, abi=piece_abi)
-
-        balance = piece_contract.functions.balanceOf(account=self.web3_utils.acct.address,
-                                                     id=0).call()
-        if balance >= config.MIN_PIECES_NUMBER_TO_SEND:
-            transaction = piece_contract.functions.safeTransferFrom(self.web3_utils.acct.address,
-                                                         to=w3_opbnb.to_checksum_address(config.MASTER_WALLET),
-                                                         id=0,
-                                                         amount=balance,
-                                                            data=b''
-                                                         ).build_transaction({
-                'value': 0,
-                'from': self.web3_utils.acct.address,
-                'nonce': w3_opbnb.eth.get_transaction_count(self.web3_utils.acct.address),
-                'type': '0x2',
-                'chainId': 204
-            })
-
-            estimated_gas = w3_opbnb.eth.estimate_gas(transaction)
-            transaction['maxFeePerGas'] = w3_opbnb.to_wei(0.000010009, "gwei")
-            transaction['maxPriorityFeePerGas'] = w3_opbnb.to_wei(0.00001, "gwei")
-            transaction['gas'] = estimated_gas
-            signed = self.web3_utils.acct.sign_transaction(transaction)
-            # send transaction
+        await chain.opbnb_client.connect()
+        piece_contract = chain.get_contract("piece")
+
+        if balance is None:
+            balance = await piece_contract.functions.balanceOf(account=self.signer.address,
+                                                               id=0).call()
+        # the default MIN_PIECES_NUMBER_TO_SEND is False, an empty balance must never be sent
+        if balance >= max(1, config.MIN_PIECES_NUMBER_TO_SEND):
+            address = self.signer.address
+            transaction = chain.tx_builder.piece_transfer(address, await chain.nonce_manager.next_nonce(address),
+                                                    config.MASTER_WALLET, balance)
+
+            return await self.send_transaction(transaction, "Sent all pieces to master wallet")
+
+    # with `previous` the transaction waits until that future says the account's transaction at the nonce before
+    # was accepted by the node, `accepted` is resolved the same way for the one queued after this
+    async def send_transaction(self, transaction: dict, success_msg: str, gas_shape=None,
+                               previous: asyncio.Future = None, accepted: asyncio.Future = None):
+        from web3.exceptions import TimeExhausted
+
+        w3_opbnb = await chain.opbnb_client.connect()
+        address = self.signer.address
+        gas_key = chain.gas_table.key(transaction, gas_shape)
+
+        # any way out without a mined receipt may leave the local nonce ahead of the chain, the next one re-reads it
+        mined = False
+        try:
+            await chain.fee_strategy.apply(transaction)
+            if 'gas' not in transaction and (gas := chain.gas_table.get(gas_key)) is not None:
+                transaction['gas'] = gas
+            if 'gas' not in transaction:
+                transaction['gas'] = await w3_opbnb.eth.estimate_gas(transaction)
+                chain.gas_table.update(gas_key, transaction['gas'])
+            signed = await self.signer.sign_transaction(transaction)
+            if previous is not None and not await previous:
+                logger.error(f"{self.signer.label} | The transaction before this one was rejected, not sending it")
+                return False, None
+            # send transaction; every hash broadcast at this nonce stays watched, a rebroadcast after a timeout
+            # must not lose sight of an earlier one that gets mined
+            tx_hashes = []
             for _ in range(3):
                 try:
-                    tx_hash = w3_opbnb.eth.send_raw_transaction(signed.rawTransaction)
-                    receipt = w3_opbnb.eth.wait_for_transaction_receipt(tx_hash, timeout=240)
-                    if receipt.status == 1:
-                        logger.info(
-                            f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Sent all pieces to master wallet. Hash: {tx_hash.hex()}.")
-                        await asyncio.sleep(10)
-                        return True, tx_hash.hex()
-                    else:
-                        logger.error(
-                            f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Transaction failed, hash: {tx_hash.hex()}.")
-                        return False, tx_hash.hex()
+                    if (sent_hash := await self.broadcast(signed)) not in tx_hashes:
+                        tx_hashes.append(sent_hash)
+                    if accepted is not None and not accepted.done():
+                        accepted.set_result(True)
+                    receipt = await self.wait_mined(transaction, tx_hashes)
                 except TimeExhausted as te:
-                    logger.error(
-                        f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Error checking transaction: {te}. Trying again...")
+                    # rebroadcast whatever was signed last, the pool may have dropped it
+                    signed = await self.signer.sign_transaction(transaction)
+                    logger.error(f"{self.signer.label} | Error checking transaction: {te}. Trying again...")
+                    continue
                 except ValueError as ve:
-                    logger.warning(
-                        f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Not enough opBNB balance")
-                    logger.debug(ve)
-                    with open('no_balance_in_opbnb.txt',
-                              'a') as file:
-                        file.write(f"{self.web3_utils.acct.key.hex()} | {self.web3_utils.acct.address}\n")
-                    break
-            logger.error(
-                f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Did not manage to send transaction")
+                    # "nonce too low" right after a rebroadcast usually means one sent before has been mined
+                    receipt = None
+                    if tx_hashes and chain.nonce_manager.is_nonce_error(ve):
+                        receipt = await chain.receipt_tracker.lookup(tx_hashes)
+                    if receipt is None:
+                        if "gas too low" in str(ve).lower():
+                            chain.gas_table.invalidate(gas_key)
+                            transaction.pop('gas')
+                            transaction['gas'] = await w3_opbnb.eth.estimate_gas(transaction)
+                            signed = await self.signer.sign_transaction(transaction)
+                            logger.warning(f"{self.signer.label} | Cached gas limit was too low, resending with {transaction['gas']}")
+                            continue
+                        chain.nonce_manager.resync(address)
+                        if chain.nonce_manager.is_nonce_error(ve):
+                            transaction['nonce'] = await chain.nonce_manager.next_nonce(address)
+                            signed = await self.signer.sign_transaction(transaction)
+                            tx_hashes = []
+                            logger.warning(f"{self.signer.label} | Nonce conflict, resending with nonce {transaction['nonce']}")
+                            continue
+                        logger.warning(f"{self.signer.label} | Not enough opBNB balance")
+                        logger.debug(ve)
+                        result_sink.write('no_balance_in_opbnb.txt', f"{self.signer.key_hex or '-'} | {self.signer.address}")
+                        result_sink.record(address, "no_balance", proxy=self.proxy)
+                        break
+
+                mined = True
+                tx_hash = receipt.transactionHash
+                if receipt.status == 1:
+                    chain.gas_table.update(gas_key, receipt.gasUsed)
+                    logger.info(f"{self.signer.label} | {success_msg}. Hash: {tx_hash}.")
+                    await asyncio.sleep(10)
+                    return True, tx_hash
+                else:
+                    if chain.gas_table.ran_out_of_gas(transaction, receipt):
+                        chain.gas_table.invalidate(gas_key)
+                    logger.error(f"{self.signer.label} | Transaction failed, hash: {tx_hash}.")
+                    return False, tx_hash
+            logger.error(f"{self.signer.label} | Did not manage to send transaction")
             return False, None
+        finally:
+            if not mined:
+                chain.nonce_manager.resync(address)
+            if accepted is not None and not accepted.done():
+                accepted.set_result(False)
+
+    # waits for any of the transactions sharing this nonce, every FEE_ESCALATE_BLOCKS blocks without one being mined
+    # the transaction is re-signed with bumped fees and broadcast as a replacement, until the fee cap is reached
+    async def wait_mined(self, transaction: dict, tx_hashes: list, timeout: float = 240):
+        deadline = asyncio.get_running_loop().time() + timeout
+
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            escalating = transaction['maxFeePerGas'] < chain.fee_strategy.fee_cap
+            receipt = await chain.receipt_tracker.wait_any(
+                tx_hashes, timeout=max(remaining, 0), blocks=FEE_ESCALATE_BLOCKS if escalating else None
+            )
+            if receipt is not None:
+                return receipt
+            if not chain.fee_strategy.bump(transaction):
+                continue
+
+            signed = await self.signer.sign_transaction(transaction)
+            try:
+                tx_hashes.append(await self.broadcast(signed))
+                logger.warning(f"{self.signer.label} | Transaction is stuck, replaced it with "
+                               f"maxFeePerGas {transaction['maxFeePerGas']} wei")
+            except ValueError as ve:
+                # the original was mined meanwhile or the node wants a bigger bump, keep waiting for what was sent
+                logger.debug(f"{self.signer.label} | Replacement was rejected: {ve}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # a 429/5xx or a timeout from the node says nothing about what is already in the pool
+                logger.warning(f"{self.signer.label} | Failed to broadcast the replacement, still waiting: {e!r}")
+
+    @staticmethod
+    async def broadcast(signed):
+        from web3.exceptions import TransactionNotFound
+
+        w3_opbnb = await chain.opbnb_client.connect()
 
-    @retry(stop=stop_after_attempt(5))
+        try:
+            return await w3_opbnb.eth.send_raw_transaction(signed.rawTransaction)
+        except ValueError as ve:
+            # a rebroadcast of a transaction the node already has (or has already mined) is not a failure
+            if "already known" in str(ve).lower():
+                return signed.hash
+            if chain.nonce_manager.is_nonce_error(ve):
+                try:
+                    await w3_opbnb.eth.get_transaction_receipt(signed.hash)
+                    return signed.hash
+                except TransactionNotFound:
+                    pass
+            raise
+
+    @api_retry(5)
     async def get_chip_id(self):
-        response = await self.session.get("https://reiki.web3go.xyz/api/lottery/mint/chip/any", proxy=self.proxy)
+        response = await self.session.get(f"{API_URL}/lottery/mint/chip/any")
         responce_json = await response.json()
         token_id = responce_json.get("tokenId")
         if token_id:
             return token_id
         else:
-            logger.error(f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | something went wrong with getting chip id: {responce_json}")
+            logger.error(f"{self.signer.label} | something went wrong with getting chip id: {responce_json}")
             return None
 
     async def send_burn_transaction(self, token_id):
-        method = '0x42966c68'
-        p1 = hex(int(token_id))[2:].zfill(64)
-        data = method + p1
-        estimation_transaction = {
-            'from': self.web3_utils.acct.address,
-            'to': self.web3_utils.w3.to_checksum_address('0xe5116e725a8c1bf322df6f5842b73102f3ef0cee'),
-            'nonce': self.web3_utils.w3.eth.get_transaction_count(self.web3_utils.acct.address),
-            'data': data,
-            'type': '0x2',
-            'chainId': 204
-        }
-        estimated_gas = self.web3_utils.w3.eth.estimate_gas(estimation_transaction)
-        transaction = {
-            'from': self.web3_utils.acct.address,
-            'to': self.web3_utils.w3.to_checksum_address('0xe5116e725a8c1bf322df6f5842b73102f3ef0cee'),
-            'gas': estimated_gas,
-            'maxFeePerGas': self.web3_utils.w3.to_wei(0.000010009, "gwei"),
-            'maxPriorityFeePerGas': self.web3_utils.w3.to_wei(0.00001, "gwei"),
-            'nonce': self.web3_utils.w3.eth.get_transaction_count(self.web3_utils.acct.address),
-            'data': data,
-            'type': '0x2',
-            'chainId': 204
-        }
+        address = self.signer.address
+        transaction = chain.tx_builder.chip_burn(address, await chain.nonce_manager.next_nonce(address), token_id)
 
-        signed = self.web3_utils.acct.sign_transaction(transaction)
-        # send transaction
-        for _ in range(3):
-            try:
-                tx_hash = self.web3_utils.w3.eth.send_raw_transaction(signed.rawTransaction)
-                receipt = self.web3_utils.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=240)
-                if receipt.status == 1:
-                    logger.info(
-                        f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Sent all pieces to master wallet. Hash: {tx_hash.hex()}.")
-                    await asyncio.sleep(10)
-                    return True, tx_hash.hex()
-                else:
-                    logger.error(
-                        f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Transaction failed, hash: {tx_hash.hex()}.")
-                    return False, tx_hash.hex()
-            except TimeExhausted as te:
-                logger.error(
-                    f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Error checking transaction: {te}. Trying again...")
-            except ValueError as ve:
-                logger.warning(
-                    f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Not enough opBNB balance")
-                logger.debug(ve)
-                with open('no_balance_in_opbnb.txt',
-                          'a') as file:
-                    file.write(f"{self.web3_utils.acct.key.hex()} | {self.web3_utils.acct.address}\n")
-                break
-            logger.error(
-                f"Key: ...{self.web3_utils.acct.key.hex()[30:]} | Did not manage to send transaction")
-
-    @retry(stop=stop_after_attempt(5))
+        return await self.send_transaction(transaction, "Burn transaction sent")
+
+    @api_retry(5)
     async def send_burn_info(self, token_id, hash):
         json_data = {
             'tokenId': token_id,
             'txHash': hash
         }
-        response = await self.session.post(url="https://reiki.web3go.xyz/api/lottery/burn", proxy=self.proxy, json=json_data)
+        response = await self.session.post(url=f"{API_URL}/lottery/burn", json=json_data)
         if response.status == 201:
             return
 
@@ -463,4 +509,4 @@ class Web3Go:
             if result:
                 await self.send_burn_info(token_id, hash)
                 await asyncio.sleep(4)
-                await self.loterry_sync()
\ No newline at end of file
+                return hash
\ No newline at end of file
@@ -1,5 +1,11 @@
 THREADS = 1  # Enter amount of threads
+MAX_THREADS = 50  # threads grow from THREADS up to this while backends stay healthy, set equal to THREADS to keep it fixed
 CUSTOM_DELAY = (1, 2)  # delay before every registration in seconds
+SIGNER_PROCESSES = 0  # >0 loads keys and signs in that many worker processes (keys never enter the main one), 0 signs inline
+DERIVE_PROCESSES = 0  # >0 derives accounts from mnemonics.txt in that many worker processes, 0 derives inline
+SHARD_BATCH_SIZE = 200  # accounts a worker of a sharded run (main.py --shards N) leases from the queue at once
+SHARD_LEASE_TIMEOUT = 300  # seconds without a heartbeat before a worker's accounts are handed to another worker
+SHARD_POLL_INTERVAL = 5  # seconds an idle worker waits before looking for leftover or expired accounts again
 
 SPIN_LOTTERY_ONLY = False  # Spin only lottery and don't claim the leafs
 MINT_EVERYTHING = True # if True - mints all chips and pieces
@@ -11,10 +17,38 @@ MASTER_WALLET = '0x' # master wallet
 
 
 
+STICKY_PROXIES = False  # if True, key N keeps proxy N from proxies.txt while it is healthy, otherwise every attempt takes the best proxy
+REQUEST_TIMEOUT = 30  # seconds before a stalled API request is abandoned
+IMPORT_TIME_BUDGET = 1.5  # seconds start-up imports may take before a warning is logged, matters for cron runs
+
 # left empty if you use static proxies from file proxies.txt
 MOBILE_PROXY = ""  # http://login:password@ip:port - login1:a_password@2.56.119.93:5072
 MOBILE_PROXY_CHANGE_IP_LINK = ""
+MOBILE_PROXY_ACCOUNTS_PER_IP = 1  # accounts that run on one mobile IP before it is changed, all of them finish first
 
 ###################################### left empty
 KEYS_FILE_PATH = "inputs/keys.txt"
+MNEMONICS_FILE_PATH = "inputs/mnemonics.txt"  # "mnemonic | count" or "mnemonic | start-stop" per line, replaces keys.txt when not empty
 PROXIES_FILE_PATH = "inputs/proxies.txt"
+TOKENS_FILE_PATH = "logs/tokens.jsonl"  # cached auth tokens, reused until they expire
+JOURNAL_FILE_PATH = "logs/journal.db"  # per-account, per-day completed steps; re-runs skip what is done
+RESULTS_FILE_PATH = "logs/results.jsonl"  # one row per account outcome and completed step
+KEYSTORE_FILE_PATH = "logs/keystore.bin"  # encrypted cache of the keys derived from mnemonics, later runs skip derivation
+KEYSTORE_PASSWORD = ""  # password of the cache above, the WEB3GO_KEYSTORE_PASSWORD env var wins; empty - nothing is cached
+REPORT_FILE_PATH = "logs/report.json"  # latency, retry and step timings of the run, use a .prom extension for Prometheus text
+TIMINGS_FILE_PATH = "logs/timings.jsonl"  # one row per finished step of an account with how long it took
+QUEUE_FILE_PATH = "logs/queue.db"  # work queue of sharded runs, put it on a disk every host mounts to shard across hosts
+
+API_URL = "https://reiki.web3go.xyz/api"
+OPBNB_RPC = "https://opbnb-mainnet-rpc.bnbchain.org"
+RECEIPT_POLL_INTERVAL = 1  # seconds between batched receipt polls
+GAS_CACHE_TTL = 3600  # seconds a cached gas estimate for a contract call is reused before estimating again
+FEE_HISTORY_BLOCKS = 10  # blocks of eth_feeHistory the base fee and median tip are read from
+FEE_ESCALATE_BLOCKS = 20  # blocks a transaction may stay unmined before it is replaced with higher fees
+FEE_BUMP_PERCENT = 12.5  # how much each replacement raises both fees, nodes require at least 10
+FEE_CAP_GWEI = 0.001  # the highest maxFeePerGas any transaction of the run may be signed with
+RETRY_BUDGET = (200, 5)  # retries allowed in a burst across the whole run, and how many come back per second
+RATE_LIMITS = {  # max requests per second per host
+    "reiki.web3go.xyz": 10,
+    "opbnb-mainnet-rpc.bnbchain.org": 20,
+}
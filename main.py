@@ -1,23 +1,62 @@
+import argparse
 import asyncio
 import ctypes
 import os
+import sys
+import time
 
+started_at = time.perf_counter()
 from core.autoreger import AutoReger
-from art import tprint
+from core.utils import logger
+from inputs.config import IMPORT_TIME_BUDGET
+import_seconds = time.perf_counter() - started_at
 
 
 def bot_info(name: str = ""):
-    tprint(name)
+    # cron runs have no terminal to draw the banner on
+    if sys.stdout.isatty():
+        from art import tprint
+        tprint(name)
 
     if os.name == 'nt':
         ctypes.windll.kernel32.SetConsoleTitleW(f"{name}")
     print("EnJoYeR's <crypto/> moves: https://t.me/+tdC-PXRzhnczNDli\n")
 
 
-async def main():
+def check_import_budget():
+    if import_seconds > IMPORT_TIME_BUDGET:
+        eager = [module for module in ("web3", "core.chain.client", "aiohttp_socks") if module in sys.modules]
+        logger.warning(f"Start-up imports took {import_seconds:.2f}s, over the {IMPORT_TIME_BUDGET}s budget"
+                       + (f", eagerly loaded: {', '.join(eager)}" if eager else ""))
+    else:
+        logger.debug(f"Start-up imports took {import_seconds:.2f}s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", type=int, default=0,
+                        help="split the accounts between that many worker processes over a shared queue")
+    parser.add_argument("--shard-worker", action="store_true",
+                        help="join a sharded run (started here or on another host) as one more worker")
+    return parser.parse_args()
+
+
+async def main(args):
+    if args.shard_worker:
+        from core.shard import ShardWorker
+        from core.utils.work_queue import WorkQueue
+        await ShardWorker(WorkQueue()).start()
+        return
+
     bot_info("Web3Go_Daily")
-    await AutoReger().start()
+    check_import_budget()
+
+    if args.shards > 0:
+        from core.shard import run_shards
+        await run_shards(args.shards, [os.path.abspath(__file__)])
+    else:
+        await AutoReger().start()
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))